@@ -1,48 +1,154 @@
 import re
 import os
+import sys
 import csv
-from flask import Flask, request, jsonify
+import hashlib
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
+import metrics
+import asrun_log
+import recurring
+from datetime import datetime
+from control_plane import ControlPlane
 
 app = Flask(__name__)
 CORS(app)
 
 SCHEDULE_FILE = "schedule.txt"
 
+# Jedini izvor istine za raspored; plejer ga deli kada radi u istom procesu
+control = ControlPlane(SCHEDULE_FILE)
+player = None
+
 def parse_schedule():
-    """Reads the schedule file and returns a list of dictionaries with date and startTime."""
-    items = []
-    if not os.path.exists(SCHEDULE_FILE):
-        return items
-    
-    # Regex for "date","startTime","name","link","duration"
-    pattern = re.compile(r'"([^"]*)","([^"]*)","([^"]*)","([^"]*)","([^"]*)"')
-    with open(SCHEDULE_FILE, "r", encoding="utf-8") as f:
-        for line in f:
-            match = pattern.search(line)
-            if match:
-                items.append({
-                    "date": match.group(1),
-                    "startTime": match.group(2),
-                    "name": match.group(3),
-                    "link": match.group(4),
-                    "duration": match.group(5)
-                })
-    return items
+    """Returns a copy of the current schedule from the control plane."""
+    control.reload_if_changed()
+    return control.snapshot()
 
 def save_schedule(schedule):
-    """Saves the schedule back to file with date and startTime."""
-    with open(SCHEDULE_FILE, "w", encoding="utf-8") as f:
-        for item in schedule:
-            f.write(f'"{item.get("date", "2026-02-23")}","{item.get("startTime", "00:00")}","{item["name"]}","{item["link"]}","{item["duration"]}"\n')
+    """Replaces the schedule; the control plane persists it to disk in the background."""
+    control.replace(schedule)
 
 @app.route('/')
 def index():
     return "<h1>TV API is running</h1><p>The Web UI is available at <a href='http://localhost:5173'>http://localhost:5173</a></p>"
 
+def assign_ids(schedule):
+    """Gives every item an id derived from its content.
+
+    Identical rows are told apart by their occurrence number, so their ids
+    shift when the player removes one of them; PATCH rejects such stale ids.
+    """
+    seen = {}
+    for item in schedule:
+        key = "|".join(item.get(k, "") for k in ("date", "startTime", "name", "link", "duration"))
+        seen[key] = seen.get(key, 0) + 1
+        item["id"] = hashlib.sha1(f"{key}#{seen[key]}".encode("utf-8")).hexdigest()[:16]
+    return schedule
+
+def occurrence_id(rule_key, date_str):
+    return f"occ-{rule_key}-{date_str}"
+
 @app.route('/api/schedule', methods=['GET'])
 def get_schedule():
-    return jsonify(parse_schedule())
+    """Returns the schedule, optionally limited to ?from=YYYY-MM-DD&to=YYYY-MM-DD (inclusive).
+
+    With a range, recurring rules are expanded into their occurrences for that
+    range only (marked with "recurring": true); without one the raw rows are
+    returned, rules included.
+    """
+    schedule = assign_ids(parse_schedule())
+    date_from = request.args.get('from')
+    date_to = request.args.get('to')
+    if not date_from and not date_to:
+        return jsonify(schedule)
+
+    literal, rules, exceptions = recurring.split_schedule(schedule)
+    if date_from:
+        literal = [item for item in literal if item["date"] >= date_from]
+    if date_to:
+        literal = [item for item in literal if item["date"] <= date_to]
+    try:
+        start = datetime.strptime(date_from, "%Y-%m-%d").timestamp() if date_from else 0
+        end = datetime.strptime(date_to, "%Y-%m-%d").timestamp() + 86399 if date_to else start + 31 * 86400
+    except ValueError:
+        return jsonify({"error": "from and to must be YYYY-MM-DD"}), 400
+
+    for occurrence in recurring.occurrences(rules, exceptions, start, end, recurring.load_state()):
+        occurrence["id"] = occurrence_id(occurrence["rule"], occurrence["date"])
+        occurrence["recurring"] = True
+        del occurrence["epoch"]
+        literal.append(occurrence)
+    literal.sort(key=lambda item: (item["date"], item["startTime"]))
+    return jsonify(literal)
+
+def validate_row(item):
+    """Returns an error message if the row's date or startTime is not valid, else None."""
+    start_time = item.get("startTime", "00:00")
+    date_field = item.get("date", "2026-02-23")
+    try:
+        datetime.strptime(start_time, "%H:%M")
+    except (TypeError, ValueError):
+        return f"Invalid startTime: {start_time}"
+    try:
+        if date_field.startswith(recurring.RULE_PREFIX):
+            recurring.Rule(item)
+        else:
+            datetime.strptime(date_field.removeprefix(recurring.EXCEPT_PREFIX), "%Y-%m-%d")
+    except (AttributeError, ValueError) as e:
+        return f"Invalid date: {date_field} ({e})"
+    return None
+
+@app.route('/api/schedule', methods=['PATCH'])
+def patch_schedule():
+    """Applies only the changed items: {"remove": [ids], "add": [items]}."""
+    data = request.json
+    if not isinstance(data, dict):
+        return jsonify({"error": "Invalid format, expected object"}), 400
+    remove = data.get("remove") or []
+    add = data.get("add") or []
+    if not isinstance(remove, list) or not all(isinstance(i, str) for i in remove):
+        return jsonify({"error": "remove must be a list of ids"}), 400
+    if not isinstance(add, list):
+        return jsonify({"error": "add must be a list of items"}), 400
+    remove = set(remove)
+    for item in add:
+        if not isinstance(item, dict) or not all(k in item for k in ("name", "link", "duration")):
+            return jsonify({"error": "Each added item needs name, link and duration"}), 400
+        error = validate_row(item)
+        if error:
+            return jsonify({"error": error}), 400
+
+    def apply(schedule):
+        schedule = [item for item in assign_ids(schedule) if item["id"] not in remove]
+
+        # Uklonjen termin ponavljajućeg pravila postaje izuzetak za taj datum
+        rules = {rule.key: rule for rule in recurring.split_schedule(schedule)[1]}
+        for removed_id in remove:
+            if removed_id.startswith("occ-"):
+                _, rule_key, date_str = removed_id.split("-", 2)
+                rule = rules.get(rule_key)
+                if rule:
+                    schedule.append({"date": f"{recurring.EXCEPT_PREFIX}{date_str}", "startTime": rule.start_time,
+                                     "name": rule.item["name"], "link": "", "duration": ""})
+        schedule.extend(add)
+        schedule.sort(key=lambda item: (item.get("date", ""), item.get("startTime", "")))
+        return schedule, None
+
+    # Čitanje i izmena pod istim lock-om, da se ne izgubi istovremena izmena plejera
+    with control.lock:
+        control.reload_if_changed()
+        schedule = assign_ids(control.snapshot())
+        known = {item["id"] for item in schedule}
+        rule_keys = {rule.key for rule in recurring.split_schedule(schedule)[1]}
+        # Id koji više ne postoji (npr. plejer je u međuvremenu skinuo stavku) znači da UI
+        # radi sa zastarelim rasporedom; tada ništa ne menjamo da ne bi nastali duplikati
+        unknown = sorted(i for i in remove if i not in known
+                         and not (i.startswith("occ-") and i.split("-", 2)[1] in rule_keys))
+        if unknown:
+            return jsonify({"error": "Schedule changed, reload and try again", "unknown": unknown}), 409
+        control.update(apply)
+    return jsonify({"status": "success", "removed": len(remove), "added": len(add)})
 
 @app.route('/api/schedule', methods=['POST'])
 def update_schedule():
@@ -52,6 +158,47 @@ def update_schedule():
     save_schedule(data)
     return jsonify({"status": "success"})
 
+@app.route('/api/player', methods=['GET'])
+def get_player_state():
+    """Returns what the player is doing right now."""
+    return jsonify(control.player_state)
+
+@app.route('/api/player/skip', methods=['POST'])
+def skip_current():
+    """Asks the player to end the clip that is on air."""
+    state = control.player_state
+    if state.get("status") != "playing":
+        return jsonify({"error": "Nothing is playing"}), 409
+    # Skip je vezan za klip koji je sada na programu, da ne preskoči sledeći
+    control.send_command("skip", started_at=state.get("started_at"))
+    return jsonify({"status": "success"})
+
+@app.route('/api/asrun', methods=['GET'])
+def get_asrun():
+    """Returns what actually aired between ?from= and ?to= (epoch or 'YYYY-MM-DD[ HH:MM]')."""
+    try:
+        start = asrun_log.parse_time(request.args.get('from'))
+        end = asrun_log.parse_time(request.args.get('to'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    entries = asrun_log.query_all(start, end)
+    channel = request.args.get('channel')
+    if channel:
+        entries = [e for e in entries if e.get("channel") == channel]
+    return jsonify(entries)
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Serves the player metrics in Prometheus text format."""
+    if player is not None:
+        # Plejer radi u ovom procesu, pa metrike čitamo direktno iz memorije
+        return Response(metrics.REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+    body = ""
+    if os.path.exists(metrics.METRICS_FILE):
+        with open(metrics.METRICS_FILE, "r", encoding="utf-8") as f:
+            body = f.read()
+    return Response(body, mimetype="text/plain; version=0.0.4")
+
 import subprocess
 
 def get_video_duration(file_path):
@@ -121,8 +268,23 @@ def parse_library():
 
 @app.route('/api/videos', methods=['GET'])
 def get_library_videos():
-    """Returns a list of videos from the library file."""
-    return jsonify(parse_library())
+    """Returns a list of videos from the library file.
+
+    With ?offset=&limit= (and optional ?q= name filter) returns one page as
+    {"items": [...], "total": n} instead of the whole list.
+    """
+    library = parse_library()
+    query = request.args.get('q', '').strip().lower()
+    if query:
+        library = [v for v in library if query in v["name"].lower()]
+    if 'offset' not in request.args and 'limit' not in request.args:
+        return jsonify(library)
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = max(1, min(500, int(request.args.get('limit', 100))))
+    except ValueError:
+        return jsonify({"error": "offset and limit must be integers"}), 400
+    return jsonify({"items": library[offset:offset + limit], "total": len(library)})
 
 if __name__ == '__main__':
     # Ensure files exist
@@ -130,4 +292,18 @@ if __name__ == '__main__':
         if not os.path.exists(f_path):
             with open(f_path, "w", encoding="utf-8") as f:
                 pass
-    app.run(port=5000, debug=True)
+
+    # Plejer radi u istom procesu i deli control plane sa API-jem;
+    # sa --no-player se pokreće samo API (npr. uz zaseban start.py)
+    if '--no-player' not in sys.argv:
+        from start import TVProgram
+        if not os.path.exists('videos'):
+            os.makedirs('videos')
+        player = TVProgram(control)
+        player.start()
+    try:
+        # Reloader bi pokrenuo još jedan proces, a time i drugi plejer
+        app.run(port=5000, debug=True, use_reloader=False)
+    finally:
+        if player is not None:
+            player.stop()
@@ -0,0 +1,180 @@
+import os
+import glob
+import json
+import time
+import heapq
+import queue
+import threading
+from bisect import bisect_right
+
+# As-run log: jedan JSON zapis po liniji, samo se dopisuje na kraj.
+ASRUN_FILE = "asrun.log"
+# Indeks: za svaki sat u kome postoji zapis čuva se bajt-offset prvog zapisa tog sata.
+ASRUN_INDEX_FILE = "asrun.idx"
+# Indeks i query pretpostavljaju da su zapisi u fajlu poređani po actual_start,
+# što važi samo dok u jedan fajl piše jedan kanal. Zato svaki kanal iz
+# multichannel.py ima svoj log (vidi channel_paths).
+INDEX_BUCKET_SECONDS = 3600
+
+
+def _round(value):
+    return round(value, 3) if value is not None else None
+
+
+class AsRunLog:
+    """Background writer for the as-run log.
+
+    ``record`` only puts the entry on a queue, so it can be called from the
+    playback thread; a daemon thread appends entries to ``ASRUN_FILE`` and
+    keeps the hourly offset index in ``ASRUN_INDEX_FILE`` up to date.
+    """
+
+    def __init__(self, path=ASRUN_FILE, index_path=ASRUN_INDEX_FILE):
+        self.path = path
+        self.index_path = index_path
+        self._queue = queue.Queue()
+        self._last_bucket = self._read_last_bucket()
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+
+    def _read_last_bucket(self):
+        if not os.path.exists(self.index_path):
+            return None
+        last = None
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2:
+                    last = int(parts[0])
+        return last
+
+    def record(self, name, link, planned_start, planned_end, actual_start, actual_end,
+               source_path=None, cache=None, status="aired", reason=None, channel=None):
+        """Queues one as-run entry. Times are epoch seconds."""
+        self._queue.put({
+            "name": name,
+            "link": link,
+            "planned_start": _round(planned_start),
+            "planned_end": _round(planned_end),
+            "actual_start": _round(actual_start),
+            "actual_end": _round(actual_end),
+            "path": source_path,
+            "cache": cache,
+            "status": status,
+            "reason": reason,
+            "channel": channel,
+        })
+
+    def _writer(self):
+        while True:
+            batch = [self._queue.get()]
+            # Pokupi sve što je u međuvremenu stiglo da bi upis bio jedan
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._append(batch)
+            except OSError as e:
+                print(f"Greška pri upisu as-run loga: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _append(self, batch):
+        index_lines = []
+        with open(self.path, "ab") as f:
+            offset = f.seek(0, os.SEEK_END)
+            for entry in batch:
+                bucket = int(entry["actual_start"] // INDEX_BUCKET_SECONDS)
+                if self._last_bucket is None or bucket > self._last_bucket:
+                    index_lines.append(f"{bucket} {offset}\n")
+                    self._last_bucket = bucket
+                line = (json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+                f.write(line)
+                offset += len(line)
+        if index_lines:
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.writelines(index_lines)
+
+    def flush(self):
+        """Blocks until every queued entry has been written."""
+        self._queue.join()
+
+
+def _load_index(index_path):
+    buckets, offsets = [], []
+    if os.path.exists(index_path):
+        with open(index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2:
+                    buckets.append(int(parts[0]))
+                    offsets.append(int(parts[1]))
+    return buckets, offsets
+
+
+def query(start=None, end=None, path=ASRUN_FILE, index_path=ASRUN_INDEX_FILE):
+    """Returns as-run entries whose actual start lies in [start, end] (epoch seconds).
+
+    The index is used to seek straight to the first hour of the range, so the
+    cost depends on the size of the range and not on the length of the log.
+    """
+    if not os.path.exists(path):
+        return []
+
+    offset = 0
+    if start is not None:
+        buckets, offsets = _load_index(index_path)
+        pos = bisect_right(buckets, int(start // INDEX_BUCKET_SECONDS)) - 1
+        if pos >= 0:
+            offset = offsets[pos]
+
+    results = []
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for raw in f:
+            try:
+                entry = json.loads(raw)
+            except ValueError:
+                # Nedovršena poslednja linija (npr. posle pada) se preskače
+                continue
+            actual_start = entry.get("actual_start") or 0
+            if start is not None and actual_start < start:
+                continue
+            if end is not None and actual_start > end:
+                break
+            results.append(entry)
+    return results
+
+
+def channel_paths(channel):
+    """Returns the (log, index) file names used by one channel of the multichannel runtime."""
+    return f"asrun_{channel}.log", f"asrun_{channel}.idx"
+
+
+def query_all(start=None, end=None):
+    """Queries the single-channel log and every per-channel log, merged by actual start."""
+    paths = [(ASRUN_FILE, ASRUN_INDEX_FILE)]
+    for path in sorted(glob.glob("asrun_*.log")):
+        paths.append((path, path[:-len(".log")] + ".idx"))
+    return list(heapq.merge(*(query(start, end, path, index_path) for path, index_path in paths),
+                            key=lambda entry: entry.get("actual_start") or 0))
+
+
+def parse_time(value):
+    """Parses an epoch number or a 'YYYY-MM-DD[ HH:MM[:SS]]' string into epoch seconds."""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    value = value.replace("T", " ")
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return time.mktime(time.strptime(value, fmt))
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid time: {value}")
@@ -0,0 +1,172 @@
+import os
+import re
+import threading
+from collections import deque
+
+SCHEDULE_PATTERN = re.compile(r'"([^"]*)","([^"]*)","([^"]*)","([^"]*)","([^"]*)"')
+SCHEDULE_FIELDS = ("date", "startTime", "name", "link", "duration")
+
+
+def parse_schedule_file(path):
+    """Čita fajl rasporeda i vraća listu stavki sa date i startTime."""
+    items = []
+    if not os.path.exists(path):
+        return items
+
+    # Regex za format "date","startTime","name","link","duration"
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            match = SCHEDULE_PATTERN.search(line)
+            if match:
+                items.append({
+                    "date": match.group(1),
+                    "startTime": match.group(2),
+                    "name": match.group(3),
+                    "link": match.group(4),
+                    "duration": match.group(5)
+                })
+    return items
+
+
+def save_schedule_file(path, schedule):
+    """Čuva listu nazad u fajl rasporeda sa date i startTime (atomski, preko privremenog fajla)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for item in schedule:
+            f.write(f'"{item.get("date", "2026-02-23")}","{item.get("startTime", "00:00")}","{item["name"]}","{item["link"]}","{item["duration"]}"\n')
+    os.replace(tmp_path, path)
+
+
+def _row(item):
+    return {k: item.get(k, "") for k in SCHEDULE_FIELDS}
+
+
+def drop_row(schedule, item):
+    """Removes the row ``item`` was taken from; returns the schedule unchanged if it is gone.
+
+    Rows are matched by content, so edits made while the item was on air
+    (removed or inserted rows) do not shift which row gets removed.
+    """
+    key = _row(item)
+    for i, row in enumerate(schedule):
+        if _row(row) == key:
+            return schedule[:i] + schedule[i + 1:]
+    return schedule
+
+
+class ControlPlane:
+    """Authoritative in-memory schedule and player state shared by the API and the player.
+
+    Edits are applied under one lock and wake the player through a condition
+    variable, so it reacts without polling the file. The schedule is written
+    to disk by a background thread; bursts of edits are coalesced into one
+    write. If the file is changed by someone else it is reloaded.
+    """
+
+    def __init__(self, schedule_file):
+        self.schedule_file = schedule_file
+        self._cond = threading.Condition(threading.RLock())
+        self._schedule = parse_schedule_file(schedule_file)
+        self._file_mtime = self._mtime()
+        self._version = 0
+        self._generation = 0  # broj izmena rasporeda; komande i reload ga ne menjaju
+        self._commands = deque()
+        self.player_state = {"status": "idle"}
+
+        self._dirty = threading.Event()
+        self._written = threading.Condition()
+        self._written_generation = 0
+        threading.Thread(target=self._writer, daemon=True).start()
+
+    def _mtime(self):
+        try:
+            return os.path.getmtime(self.schedule_file)
+        except OSError:
+            return None
+
+    @property
+    def lock(self):
+        return self._cond
+
+    @property
+    def version(self):
+        return self._version
+
+    def _changed(self):
+        # Pozvati pod lock-om: nova verzija, buđenje plejera i zakazivanje upisa
+        self._version += 1
+        self._generation += 1
+        self._cond.notify_all()
+        self._dirty.set()
+
+    def snapshot(self):
+        """Returns a copy of the current schedule."""
+        with self._cond:
+            return [dict(item) for item in self._schedule]
+
+    def replace(self, schedule):
+        with self._cond:
+            self._schedule = [_row(item) for item in schedule]
+            self._changed()
+
+    def update(self, fn):
+        """Applies ``fn(schedule) -> (new_schedule, result)`` atomically and returns ``result``."""
+        with self._cond:
+            schedule, result = fn([dict(item) for item in self._schedule])
+            self._schedule = [_row(item) for item in schedule]
+            self._changed()
+            return result
+
+    def reload_if_changed(self):
+        """Picks up edits made to the file outside of this process."""
+        mtime = self._mtime()
+        with self._cond:
+            if mtime is not None and mtime != self._file_mtime and not self._dirty.is_set():
+                self._schedule = parse_schedule_file(self.schedule_file)
+                self._file_mtime = mtime
+                self._version += 1
+                self._cond.notify_all()
+
+    def wait(self, since_version, timeout):
+        """Blocks until the schedule or a command changes after ``since_version``, or ``timeout``."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._version != since_version, timeout)
+
+    def send_command(self, command, **args):
+        """Queues a command for the player; ``args`` can name the clip it targets."""
+        with self._cond:
+            self._commands.append((command, args))
+            self._version += 1
+            self._cond.notify_all()
+
+    def take_command(self):
+        with self._cond:
+            return self._commands.popleft() if self._commands else None
+
+    def set_player_state(self, **state):
+        with self._cond:
+            self.player_state = state
+
+    def flush(self, timeout=5):
+        """Waits until the latest schedule edit has been written to disk."""
+        with self._cond:
+            target = self._generation
+        with self._written:
+            return self._written.wait_for(lambda: self._written_generation >= target, timeout)
+
+    def _writer(self):
+        while True:
+            self._dirty.wait()
+            with self._cond:
+                self._dirty.clear()
+                schedule = [dict(item) for item in self._schedule]
+                generation = self._generation
+            try:
+                save_schedule_file(self.schedule_file, schedule)
+                with self._cond:
+                    self._file_mtime = self._mtime()
+            except OSError as e:
+                print(f"Greška pri upisu rasporeda: {e}")
+            with self._written:
+                self._written_generation = generation
+                self._written.notify_all()
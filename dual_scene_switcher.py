@@ -2,6 +2,8 @@ import obsws_python as obs
 import os
 import time
 import sys
+import threading
+import metrics
 
 # OBS Configuration
 OBS_HOST = "127.0.0.1"
@@ -14,12 +16,30 @@ SCENE_B = "Scene_B"
 SOURCE_A = "VideoPlayer_A"
 SOURCE_B = "VideoPlayer_B"
 
+# Protokol spremnosti (arming) sledećeg deck-a
+ARM_POLL_INTERVAL = 0.05  # Koliko često (s) proveravamo deck dok se naoružava
+ARM_TIMEOUT = 10.0        # Najduže čekanje (s) da deck postane spreman
+MIN_SWITCH_LEAD_MS = 40   # Najmanji razmak pre kraja klipa za prebacivanje
+# Šta radimo ako sledeći deck nije spreman kada dođe trenutak prebacivanja:
+#   "hold"   - ostajemo na trenutnom deck-u (poslednji frejm) dok se sledeći ne naoruža
+#              ili ne istekne ARM_TIMEOUT, pa tek onda prebacujemo
+#   "switch" - prebacujemo odmah, bez obzira na spremnost
+#   "skip"   - preskačemo sledeći video i pripremamo onaj posle njega
+NOT_ARMED_FALLBACK = "hold"
+
+PLAYING = "OBS_MEDIA_STATE_PLAYING"
+PAUSED = "OBS_MEDIA_STATE_PAUSED"
+ENDED = "OBS_MEDIA_STATE_ENDED"
+
 class DualVideoSwitcher:
     def __init__(self):
         try:
-            self.cl = obs.ReqClient(host=OBS_HOST, port=OBS_PORT, password=OBS_PASSWORD)
+            metrics.OBS_RECONNECTS_TOTAL.inc()
+            self.cl = metrics.InstrumentedClient(
+                obs.ReqClient(host=OBS_HOST, port=OBS_PORT, password=OBS_PASSWORD))
             print("Connected to OBS!")
         except Exception as e:
+            metrics.FAILURES_TOTAL.inc("obs_connect")
             print(f"Failed to connect to OBS: {e}")
             sys.exit(1)
         
@@ -30,6 +50,29 @@ class DualVideoSwitcher:
         self.next_scene = SCENE_B
         self.current_source = SOURCE_A
         self.next_source = SOURCE_B
+        self.finished_at = None  # perf_counter trenutka kada je detektovan kraj klipa
+
+        self.armed = False           # Da li je sledeći deck učitan, dekodiran i pauziran na početku
+        self.arming_started = None   # perf_counter početka pripreme sledećeg deck-a
+        self.switch_latency_ms = 100.0  # Izmereno (EWMA) trajanje prebacivanja scene
+        self.skipped = False         # Da li je "skip" već primenjen pre ovog prebacivanja
+        self.media_event = threading.Event()
+        self.events = None
+        try:
+            # Događaji iz OBS-a bude petlju čim se nešto promeni, umesto da čeka ceo interval
+            self.events = obs.EventClient(host=OBS_HOST, port=OBS_PORT, password=OBS_PASSWORD)
+            self.events.callback.register([
+                self.on_media_input_playback_started,
+                self.on_media_input_playback_ended,
+            ])
+        except Exception as e:
+            print(f"Napomena: OBS događaji nisu dostupni, koristim samo proveru statusa: {e}")
+
+    def on_media_input_playback_started(self, data):
+        self.media_event.set()
+
+    def on_media_input_playback_ended(self, data):
+        self.media_event.set()
 
     def setup_obs(self):
         """Osigurava da scene i izvori postoje u OBS-u."""
@@ -82,7 +125,13 @@ class DualVideoSwitcher:
             print(f"Greška: Video {video_name} ne postoji u folderu {self.videos_dir}")
 
     def preload_next(self):
-        """Učitava sledeći video iz plejliste u pozadinsku scenu."""
+        """Učitava sledeći video u pozadinski deck i pokreće pre-roll.
+
+        Deck postaje spreman (armed) tek kada poll_armed potvrdi da je prvi
+        frejm dekodiran i da je trajanje poznato.
+        """
+        self.armed = False
+        self.arming_started = None
         if len(self.playlist) < 2:
             # Nema sledećeg videa za učitavanje
             return
@@ -92,14 +141,57 @@ class DualVideoSwitcher:
         
         print(f"Pripremam sledeći video: {video_name} u {self.next_source}")
         try:
+            # Deck ostaje otvoren i posle aktivacije nastavlja od pauziranog prvog frejma
             self.cl.set_input_settings(self.next_source, {
                 'local_file': video_path,
-                'restart_on_activate': True,
-                'close_when_inactive': True
+                'restart_on_activate': False,
+                'close_when_inactive': False
             }, True)
+            self.cl.trigger_media_input_action(self.next_source, 'OBS_WEBSOCKET_MEDIA_INPUT_ACTION_RESTART')
+            self.arming_started = time.perf_counter()
         except Exception as e:
             print(f"Greška pri pripremanju videa {video_name}: {e}")
 
+    def poll_armed(self):
+        """Proverava da li je pozadinski deck dekodirao prvi frejm; ako jeste, pauzira ga na početku."""
+        if self.armed or self.arming_started is None:
+            return self.armed
+        try:
+            status = self.cl.get_media_input_status(self.next_source)
+        except Exception:
+            return False
+        if not status.media_duration or status.media_state not in (PLAYING, PAUSED):
+            return False
+
+        try:
+            if status.media_state == PLAYING:
+                self.cl.trigger_media_input_action(self.next_source, 'OBS_WEBSOCKET_MEDIA_INPUT_ACTION_PAUSE')
+            if status.media_cursor:
+                self.cl.set_media_input_cursor(self.next_source, 0)
+        except Exception as e:
+            # Deck ostaje nenaoružan; pokušavamo ponovo pri sledećoj proveri
+            print(f"Greška pri pauziranju deck-a {self.next_source}: {e}")
+            return False
+        arm_time = time.perf_counter() - self.arming_started
+        metrics.DECK_ARM_SECONDS.observe(arm_time)
+        self.armed = True
+        print(f"Deck {self.next_source} spreman za {arm_time * 1000:.0f}ms.")
+        return True
+
+    def wait_until_playing(self, source, timeout=ARM_TIMEOUT):
+        """Čeka da izvor stvarno krene (umesto fiksne pauze posle pokretanja)."""
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            try:
+                status = self.cl.get_media_input_status(source)
+                if status.media_state == PLAYING and status.media_duration:
+                    return True
+            except Exception:
+                pass
+            self.media_event.wait(ARM_POLL_INTERVAL)
+            self.media_event.clear()
+        return False
+
     def play_initial(self):
         """Pušta prvi video iz plejliste."""
         if not self.playlist:
@@ -119,27 +211,22 @@ class DualVideoSwitcher:
         except Exception as e:
             print(f"Greška pri puštanju prvog videa: {e}")
 
-    def is_video_finished(self):
-        """Proverava da li je video pri kraju ili završen."""
+    def remaining_ms(self):
+        """Vraća koliko je ms ostalo do kraja trenutnog videa (0 ako je završen, None ako nije poznato)."""
         if not self.playlist:
-            return False
-            
+            return None
         try:
             status = self.cl.get_media_input_status(self.current_source)
-            # Prag za prebacivanje (500ms pre kraja)
-            threshold = 500 
-            
-            if status.media_state == "OBS_MEDIA_STATE_ENDED":
-                return True
-            
-            if status.media_duration > 0:
-                remaining = status.media_duration - status.media_cursor
-                if 0 < remaining < threshold:
-                    print(f"Prebacujem scenu (ostalo je još {remaining}ms)...")
-                    return True
         except Exception:
-            pass
-        return False
+            return None
+        if status.media_state == ENDED:
+            return 0
+        if status.media_duration and status.media_duration > 0:
+            return max(0, status.media_duration - status.media_cursor)
+        return None
+
+    def switch_lead_ms(self):
+        return max(MIN_SWITCH_LEAD_MS, self.switch_latency_ms)
 
     def switch_scenes_and_pop(self):
         """Prebacuje scenu i izbacuje završeni video iz plejliste."""
@@ -161,12 +248,61 @@ class DualVideoSwitcher:
         
         # Izvršimo promenu u OBS-u
         try:
+            started = time.perf_counter()
             self.cl.set_current_program_scene(self.current_scene)
+            self.cl.trigger_media_input_action(self.current_source, 'OBS_WEBSOCKET_MEDIA_INPUT_ACTION_PLAY')
+            switched = time.perf_counter()
+            # Sledeće prebacivanje počinjemo onoliko ranije koliko ono stvarno traje
+            self.switch_latency_ms = 0.8 * self.switch_latency_ms + 0.2 * (switched - started) * 1000
+            if self.finished_at is not None:
+                metrics.TRANSITION_GAP_SECONDS.observe(max(0.0, switched - self.finished_at))
         except Exception as e:
+            metrics.FAILURES_TOTAL.inc("obs_switch")
             print(f"Greška prilikom promene scene u OBS-u: {e}")
+        self.finished_at = None
+        self.skipped = False
+
+    def handle_not_armed(self, remaining):
+        """Primena NOT_ARMED_FALLBACK kada sledeći deck nije spreman. Vraća True ako treba prebaciti."""
+        waited = time.perf_counter() - self.arming_started if self.arming_started else ARM_TIMEOUT
+        if NOT_ARMED_FALLBACK == "switch":
+            return True
+        if NOT_ARMED_FALLBACK == "skip" and not self.skipped and len(self.playlist) > 1:
+            skipped = self.playlist.pop(1)
+            metrics.FAILURES_TOTAL.inc("deck_not_armed")
+            print(f"Deck {self.next_source} nije spreman, preskačem: {skipped}")
+            # Samo jedan skip po prebacivanju; novi deck dobija svoj ARM_TIMEOUT kao kod "hold",
+            # inače bi svaka sledeća provera preskočila još jedan video i ispraznila plejlistu
+            self.skipped = True
+            self.preload_next()
+            return False
+        # "hold": čekamo dok se deck ne naoruža, ali ne duže od ARM_TIMEOUT
+        if remaining == 0 and waited >= ARM_TIMEOUT:
+            metrics.FAILURES_TOTAL.inc("deck_not_armed")
+            print(f"Deck {self.next_source} nije spreman ni posle {ARM_TIMEOUT}s, prebacujem svejedno.")
+            return True
+        return False
+
+    def next_wait(self, remaining):
+        """Koliko dugo (s) petlja može da spava pre sledeće provere."""
+        if remaining is None or not self.armed:
+            return ARM_POLL_INTERVAL if self.arming_started is not None else 0.5
+        until_switch = (remaining - self.switch_lead_ms()) / 1000.0
+        # Polovina preostalog vremena, tako da se tačan trenutak ne preskoči
+        return min(0.5, max(0.005, until_switch / 2))
+
+    def write_metrics_periodically(self, interval=5):
+        """Upisuje metrike u pozadinskoj niti, van petlje koja tempira prebacivanje."""
+        while True:
+            time.sleep(interval)
+            try:
+                metrics.REGISTRY.write_textfile(metrics.METRICS_FILE)
+            except OSError as e:
+                print(f"Greška pri upisu metrika: {e}")
 
     def run(self):
         self.setup_obs()
+        threading.Thread(target=self.write_metrics_periodically, daemon=True).start()
         
         # Ubacivanje inicijalnih videa
         self.add_to_playlist("video1.mp4")
@@ -180,16 +316,22 @@ class DualVideoSwitcher:
 
         # Početak emitovanja
         self.play_initial()
-        time.sleep(1.5)
+        self.wait_until_playing(self.current_source)
         self.preload_next()
 
         print("Program radi. Naizmenično menjam Scene_A i Scene_B uz uklanjanje iz plejliste.")
         try:
             while True:
-                if self.is_video_finished():
-                    self.switch_scenes_and_pop()
-                    self.preload_next()
-                    time.sleep(2) 
+                self.poll_armed()
+                remaining = self.remaining_ms()
+                if remaining is not None and remaining <= self.switch_lead_ms():
+                    if self.finished_at is None:
+                        self.finished_at = time.perf_counter() + remaining / 1000.0
+                    if len(self.playlist) < 2 or self.armed or self.handle_not_armed(remaining):
+                        if remaining:
+                            print(f"Prebacujem scenu (ostalo je još {remaining}ms)...")
+                        self.switch_scenes_and_pop()
+                        self.preload_next()
                 
                 # Ako se plejlista isprazni, program može da čeka ili da se ugasi
                 if not self.playlist:
@@ -198,10 +340,11 @@ class DualVideoSwitcher:
                         time.sleep(5)
                     # Ako su dodati novi, nastavljamo
                     self.play_initial()
-                    time.sleep(1.5)
+                    self.wait_until_playing(self.current_source)
                     self.preload_next()
 
-                time.sleep(0.5)
+                self.media_event.wait(self.next_wait(remaining))
+                self.media_event.clear()
         except KeyboardInterrupt:
             print("Gašenje programa...")
 
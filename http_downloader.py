@@ -0,0 +1,248 @@
+import os
+import re
+import json
+import queue
+import hashlib
+import threading
+import http.client
+from urllib.parse import urlsplit, urljoin, unquote
+
+SEGMENT_SIZE = 8 * 1024 * 1024  # Veličina jednog dela koji se preuzima jednim Range zahtevom
+CONNECTIONS = 4                 # Broj paralelnih konekcija
+READ_SIZE = 256 * 1024
+RETRIES = 3
+TIMEOUT = 30
+MAX_REDIRECTS = 5
+
+
+class DownloadError(Exception):
+    pass
+
+
+def _open_connection(parts):
+    conn_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    return conn_class(parts.netloc, timeout=TIMEOUT)
+
+
+def _target(parts):
+    return parts.path + (f"?{parts.query}" if parts.query else "") or "/"
+
+
+def _probe(url):
+    """Follows redirects and returns (final_url, size, accepts_ranges, etag)."""
+    for _ in range(MAX_REDIRECTS):
+        parts = urlsplit(url)
+        conn = _open_connection(parts)
+        try:
+            # GET sa Range 0-0 umesto HEAD jer ga neki serveri ne podržavaju
+            conn.request("GET", _target(parts), headers={"Range": "bytes=0-0"})
+            response = conn.getresponse()
+            response.read(1024)
+            if response.status in (301, 302, 303, 307, 308):
+                location = response.getheader("Location")
+                if not location:
+                    raise DownloadError(f"HTTP {response.status} bez Location zaglavlja za {url}")
+                url = urljoin(url, location)
+                continue
+            if response.status == 206:
+                match = re.search(r"/(\d+)$", response.getheader("Content-Range", ""))
+                size = int(match.group(1)) if match else None
+                return url, size, size is not None, response.getheader("ETag")
+            if response.status == 200:
+                length = response.getheader("Content-Length")
+                return url, int(length) if length else None, False, response.getheader("ETag")
+            raise DownloadError(f"HTTP {response.status} za {url}")
+        finally:
+            conn.close()
+    raise DownloadError(f"Previše preusmerenja za {url}")
+
+
+def _output_name(url):
+    name = unquote(os.path.basename(urlsplit(url).path)) or "video.mp4"
+    return re.sub(r'[<>:"/\\|?*]', "_", name)
+
+
+class _SegmentedDownload:
+    """Downloads one file as fixed-size byte ranges over a pool of keep-alive connections.
+
+    Finished segments are recorded in ``<file>.part.json`` so an interrupted
+    download continues where it stopped.
+    """
+
+    def __init__(self, url, size, etag, part_path, connections):
+        self.url = url
+        self.parts = urlsplit(url)
+        self.size = size
+        self.etag = etag
+        self.part_path = part_path
+        self.state_path = part_path + ".json"
+        self.connections = connections
+        self.segment_count = (size + SEGMENT_SIZE - 1) // SEGMENT_SIZE
+        self.done = self._load_done()
+        self.lock = threading.Lock()
+        self.errors = []
+
+    def _load_done(self):
+        if not (os.path.exists(self.part_path) and os.path.exists(self.state_path)):
+            return set()
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return set()
+        # Nastavak samo ako je na serveru i dalje isti fajl
+        if state.get("size") != self.size or state.get("etag") != self.etag:
+            return set()
+        return set(state.get("done", []))
+
+    def _save_done(self):
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"url": self.url, "size": self.size, "etag": self.etag, "done": sorted(self.done)}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _fetch_segment(self, conn, index, f):
+        start = index * SEGMENT_SIZE
+        end = min(start + SEGMENT_SIZE, self.size) - 1
+        conn.request("GET", _target(self.parts), headers={"Range": f"bytes={start}-{end}"})
+        response = conn.getresponse()
+        if response.status != 206 or not response.getheader("Content-Range", "").startswith(f"bytes {start}-{end}/"):
+            response.read()
+            raise DownloadError(f"Neočekivan odgovor za deo {index}: HTTP {response.status}")
+        f.seek(start)
+        received = 0
+        while True:
+            chunk = response.read(READ_SIZE)
+            if not chunk:
+                break
+            f.write(chunk)
+            received += len(chunk)
+        if received != end - start + 1:
+            raise DownloadError(f"Deo {index} je nepotpun ({received} od {end - start + 1} bajtova)")
+
+    def _worker(self, segments):
+        conn = _open_connection(self.parts)
+        try:
+            with open(self.part_path, "r+b") as f:
+                while True:
+                    try:
+                        index = segments.get_nowait()
+                    except queue.Empty:
+                        return
+                    for attempt in range(RETRIES):
+                        try:
+                            self._fetch_segment(conn, index, f)
+                            break
+                        except (OSError, http.client.HTTPException, DownloadError) as e:
+                            # Nova konekcija pa ponovni pokušaj istog dela
+                            conn.close()
+                            conn = _open_connection(self.parts)
+                            if attempt == RETRIES - 1:
+                                with self.lock:
+                                    self.errors.append(str(e))
+                                return
+                    f.flush()
+                    with self.lock:
+                        self.done.add(index)
+                        self._save_done()
+        finally:
+            conn.close()
+
+    def run(self):
+        if not self.done or not os.path.exists(self.part_path):
+            self.done = set()
+            with open(self.part_path, "wb") as f:
+                f.truncate(self.size)
+        elif self.done:
+            print(f"Nastavljam prekinuto preuzimanje ({len(self.done)}/{self.segment_count} delova).")
+
+        segments = queue.Queue()
+        for index in range(self.segment_count):
+            if index not in self.done:
+                segments.put(index)
+
+        workers = [threading.Thread(target=self._worker, args=(segments,), daemon=True)
+                   for _ in range(min(self.connections, segments.qsize()))]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+
+        if self.errors or len(self.done) != self.segment_count:
+            raise DownloadError(self.errors[0] if self.errors else "Preuzimanje nije završeno")
+
+
+def _download_single(url, part_path):
+    """Fallback for servers without Range support: one plain streaming GET."""
+    parts = urlsplit(url)
+    conn = _open_connection(parts)
+    try:
+        conn.request("GET", _target(parts))
+        response = conn.getresponse()
+        if response.status != 200:
+            raise DownloadError(f"HTTP {response.status} za {url}")
+        with open(part_path, "wb") as f:
+            while True:
+                chunk = response.read(READ_SIZE)
+                if not chunk:
+                    break
+                f.write(chunk)
+    finally:
+        conn.close()
+
+
+def _verify(path, size, etag):
+    """Checks the size and, when the ETag is a plain MD5, the content hash."""
+    if size is not None and os.path.getsize(path) != size:
+        raise DownloadError(f"Pogrešna veličina fajla: {os.path.getsize(path)} umesto {size}")
+    md5 = (etag or "").strip('"')
+    if re.fullmatch(r"[0-9a-fA-F]{32}", md5):
+        digest = hashlib.md5()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        if digest.hexdigest().lower() != md5.lower():
+            raise DownloadError("MD5 se ne poklapa sa ETag-om")
+
+
+def download_http_video(url, output_dir='videos', connections=CONNECTIONS):
+    """
+    Downloads a video from a direct HTTP(S) link using parallel byte-range requests.
+
+    Args:
+        url (str): Direct link to the media file.
+        output_dir (str): The local directory to save the video.
+        connections (int): Number of parallel connections.
+    """
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    try:
+        final_url, size, accepts_ranges, etag = _probe(url)
+        output_path = os.path.join(output_dir, _output_name(final_url))
+        if os.path.exists(output_path) and size is not None and os.path.getsize(output_path) == size:
+            print(f"Fajl je već preuzet: {output_path}")
+            return output_path
+
+        part_path = output_path + ".part"
+        print(f"Preuzimanje HTTP videa: {final_url}")
+        if accepts_ranges and size:
+            _SegmentedDownload(final_url, size, etag, part_path, connections).run()
+        else:
+            _download_single(final_url, part_path)
+        _verify(part_path, size, etag)
+
+        os.replace(part_path, output_path)
+        if os.path.exists(part_path + ".json"):
+            os.remove(part_path + ".json")
+        print(f"Preuzimanje završeno! Fajl je sačuvan kao: {output_path}")
+        return output_path
+    except (OSError, ValueError, http.client.HTTPException, DownloadError) as e:
+        # ValueError: neispravan URL ili Content-Length/Content-Range od servera
+        print(f"Greška prilikom HTTP preuzimanja: {e}")
+        return None
+
+if __name__ == "__main__":
+    video_url = input("Unesite direktan HTTP link: ")
+    if video_url:
+        download_http_video(video_url)
@@ -0,0 +1,207 @@
+import os
+import time
+import threading
+from bisect import bisect_left
+
+# Fajl u koji plejer (start.py / dual_scene_switcher.py) periodično upisuje
+# svoje metrike, a api.py ga servira na /metrics.
+METRICS_FILE = "metrics.prom"
+
+# Podrazumevani bucket-i (u sekundama) za kratke operacije kao što su OBS zahtevi
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Bucket-i za duže operacije (preuzimanja, kašnjenje rasporeda, pauze između klipova)
+SLOW_BUCKETS = (0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 900.0)
+# Bucket-i za protok preuzimanja (bajtova u sekundi)
+THROUGHPUT_BUCKETS = (64e3, 256e3, 1e6, 4e6, 16e6, 64e6, 256e6)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + body + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """A monotonically increasing counter, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in items
+        ]
+
+
+class Histogram:
+    """A cumulative histogram with fixed buckets, optionally split by labels.
+
+    ``observe`` only does a bisect and three additions under a lock, so it is
+    cheap enough to call from the playback loop.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                # [brojači po bucket-u (+Inf na kraju), suma, ukupno]
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][idx] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *labelvalues):
+        """Context manager that observes the elapsed wall time of its block."""
+        return _Timer(self, labelvalues)
+
+    def collect(self):
+        with self._lock:
+            items = sorted((labels, (list(s[0]), s[1], s[2])) for labels, s in self._series.items())
+        lines = []
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                lbl = _format_labels(self.labelnames, labels, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{lbl} {cumulative}")
+            lbl = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{lbl} {_format_value(total)}")
+            lines.append(f"{self.name}_count{lbl} {count}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labelvalues", "start")
+
+    def __init__(self, histogram, labelvalues):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labelvalues)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Returns all registered metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path=METRICS_FILE):
+        """Atomically writes the rendered metrics to ``path``."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+REGISTRY = Registry()
+
+OBS_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "ultratv_obs_request_seconds", "Latency of OBS websocket requests.", ("request",)))
+DOWNLOAD_SECONDS = REGISTRY.register(Histogram(
+    "ultratv_download_seconds", "Time spent downloading a media item.", ("source",), SLOW_BUCKETS))
+DOWNLOAD_THROUGHPUT = REGISTRY.register(Histogram(
+    "ultratv_download_bytes_per_second", "Average throughput of a completed download.", ("source",),
+    THROUGHPUT_BUCKETS))
+TRANSITION_GAP_SECONDS = REGISTRY.register(Histogram(
+    "ultratv_transition_gap_seconds", "Time between the end of one clip and the start of the next.",
+    buckets=LATENCY_BUCKETS + SLOW_BUCKETS[4:]))
+SCHEDULE_LAG_SECONDS = REGISTRY.register(Histogram(
+    "ultratv_schedule_lag_seconds", "Delay between the planned and the actual start of an item.",
+    buckets=SLOW_BUCKETS))
+DECK_ARM_SECONDS = REGISTRY.register(Histogram(
+    "ultratv_deck_arm_seconds", "Time from preloading a deck until its first frame is decoded.",
+    buckets=LATENCY_BUCKETS + SLOW_BUCKETS[4:]))
+FAILURES_TOTAL = REGISTRY.register(Counter(
+    "ultratv_failures_total", "Failures by stage.", ("stage",)))
+OBS_RECONNECTS_TOTAL = REGISTRY.register(Counter(
+    "ultratv_obs_reconnects_total", "Attempts to (re)connect to OBS."))
+
+
+class InstrumentedClient:
+    """Wraps an ``obsws_python.ReqClient`` and times every request made through it."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return attr(*args, **kwargs)
+            except Exception:
+                FAILURES_TOTAL.inc("obs_request")
+                raise
+            finally:
+                OBS_REQUEST_SECONDS.observe(time.perf_counter() - start, name)
+
+        # Keširamo omotač da se ne pravi nova funkcija pri svakom pozivu
+        setattr(self, name, timed)
+        return timed
+
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
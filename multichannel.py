@@ -0,0 +1,345 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import obsws_python as obs
+import metrics
+import playout_state
+import recurring
+from asrun_log import AsRunLog, channel_paths
+from control_plane import parse_schedule_file, save_schedule_file, drop_row
+from recurring import parse_duration, next_scheduled_item
+from start import (OBS_HOST, OBS_PORT, OBS_PASSWORD, OBS_SOURCE_NAME, SCHEDULE_FILE,
+                   planned_start, fetch_media)
+
+# Konfiguracija kanala: lista objekata sa name, schedule, obs_host, obs_port,
+# obs_password, sources (deck izvori), opciono scenes (po jedna scena za svaki deck)
+# i state_file (checkpoint za nastavak posle restarta), recurring_state (stanje
+# ponavljajućih pravila), asrun_log/asrun_index (as-run log kanala).
+CHANNELS_FILE = "channels.json"
+DOWNLOAD_WORKERS = 4
+POLL_INTERVAL = 1.0
+OBS_CALL_TIMEOUT = 5.0  # Najduže čekanje (s) na jedan OBS zahtev
+PREFETCH_RETRY_MIN = 30.0   # Posle neuspelog preuzimanja prefetch se ponavlja tek posle ovoliko sekundi,
+PREFETCH_RETRY_MAX = 900.0  # a razmak se duplira sa svakim sledećim neuspehom do ove granice
+
+
+class MediaCache:
+    """Shared download pool and media cache for all channels.
+
+    The same link requested by several channels at once is downloaded only
+    once; later requests are served from the cache while the file exists.
+    """
+
+    def __init__(self, max_workers=DOWNLOAD_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="download")
+        self._files = {}    # link -> putanja do preuzetog fajla
+        self._pending = {}  # link -> future preuzimanja koje je u toku
+        self._failed = {}   # link -> (monotonic vreme sledećeg pokušaja prefetch-a, razmak)
+
+    async def fetch(self, link):
+        """Returns (path, cache) just like ``start.fetch_media``."""
+        path = self._files.get(link)
+        if path and os.path.exists(path):
+            return path, "hit"
+
+        future = self._pending.get(link)
+        if future is not None:
+            path, _ = await asyncio.shield(future)
+            return path, "hit"
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, fetch_media, link)
+        self._pending[link] = future
+        try:
+            path, cache = await asyncio.shield(future)
+        except Exception:
+            self._mark_failed(link)
+            raise
+        finally:
+            self._pending.pop(link, None)
+        if not path:
+            self._mark_failed(link)
+        else:
+            self._failed.pop(link, None)
+            if cache != "local":
+                self._files[link] = path
+        return path, cache
+
+    def _mark_failed(self, link):
+        _, delay = self._failed.get(link, (0, PREFETCH_RETRY_MIN / 2))
+        delay = min(PREFETCH_RETRY_MAX, delay * 2)
+        self._failed[link] = (time.monotonic() + delay, delay)
+
+    def prefetch(self, link):
+        """Starts downloading ``link`` in the background without waiting for it."""
+        if not link.startswith(("http://", "https://")) or link in self._pending or link in self._files:
+            # Lokalni fajlovi i scene se ne preuzimaju
+            return
+        if self._failed.get(link, (0, 0))[0] > time.monotonic():
+            # Neispravan link ne sme da zauzima zajednički pool svake sekunde
+            return
+        task = asyncio.ensure_future(self.fetch(link))
+        # Greške prefetch-a se ignorišu; biće ponovo prijavljene kada stavka dođe na red
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+class Channel:
+    """One playout channel driven as a coroutine on the shared event loop."""
+
+    def __init__(self, config, cache):
+        self.name = config["name"]
+        self.schedule_file = config.get("schedule", SCHEDULE_FILE)
+        self.obs_host = config.get("obs_host", OBS_HOST)
+        self.obs_port = config.get("obs_port", OBS_PORT)
+        self.obs_password = config.get("obs_password", OBS_PASSWORD)
+        self.sources = config.get("sources") or [OBS_SOURCE_NAME]
+        self.scenes = config.get("scenes") or []
+        self.state_file = config.get("state_file", f"playout_state_{self.name}.json")
+        self.resume_state = playout_state.load_state(self.state_file)
+        self.recurring_state_file = config.get("recurring_state", f"recurring_state_{self.name}.json")
+        self.recurring_state = recurring.load_state(self.recurring_state_file)
+        self.cache = cache
+        # Svaki kanal ima svoj as-run log, da bi zapisi u fajlu ostali poređani po početku
+        log_path, index_path = channel_paths(self.name)
+        self.asrun = AsRunLog(config.get("asrun_log", log_path), config.get("asrun_index", index_path))
+        self.client = None
+        # Svaki kanal ima svoju nit za OBS zahteve (ukupno onoliko niti koliko ima kanala),
+        # pa spor ili zaglavljen OBS jednog kanala ne blokira proveru statusa ostalih.
+        # Jedna nit ujedno serijalizuje zahteve ka istoj websocket konekciji.
+        self.obs_executor = self._new_obs_executor()
+        self.deck = 0
+        self.last_clip_end = None
+        self._schedule = []
+        self._schedule_mtime = None
+
+    def log(self, message):
+        print(f"[{self.name}] {message}")
+
+    def _new_obs_executor(self):
+        return ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"obs-{self.name}")
+
+    async def _run_obs(self, fn, *args):
+        """Runs a blocking OBS call on this channel's thread, with OBS_CALL_TIMEOUT."""
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(self.obs_executor, fn, *args), OBS_CALL_TIMEOUT)
+        except asyncio.TimeoutError:
+            metrics.FAILURES_TOTAL.inc("obs_timeout")
+            # Zaglavljena nit se napušta; sledeći zahtev ide preko nove niti i nove konekcije
+            self.obs_executor.shutdown(wait=False)
+            self.obs_executor = self._new_obs_executor()
+            self.client = None
+            raise
+
+    async def call(self, request, *args):
+        """Runs a blocking OBS request off the event loop."""
+        if self.client is None:
+            await self.connect()
+        return await self._run_obs(getattr(self.client, request), *args)
+
+    async def connect(self):
+        metrics.OBS_RECONNECTS_TOTAL.inc()
+        try:
+            client = await self._run_obs(
+                lambda: obs.ReqClient(host=self.obs_host, port=self.obs_port, password=self.obs_password))
+        except Exception:
+            metrics.FAILURES_TOTAL.inc("obs_connect")
+            raise
+        self.client = metrics.InstrumentedClient(client)
+        self.log("Povezan sa OBS-om.")
+
+    def load_schedule(self):
+        """Re-parses the schedule file only when it has changed on disk."""
+        try:
+            mtime = os.path.getmtime(self.schedule_file)
+        except OSError:
+            self._schedule, self._schedule_mtime = [], None
+            return self._schedule
+        if mtime != self._schedule_mtime:
+            self._schedule = parse_schedule_file(self.schedule_file)
+            self._schedule_mtime = mtime
+        return self._schedule
+
+    def pop_schedule(self, item):
+        if item.get('rule'):
+            recurring.consume(self.recurring_state, item, self.recurring_state_file)
+            return
+        # Ponovo čitamo fajl jer je API mogao da ga izmeni dok je stavka bila na programu
+        self._schedule_mtime = None
+        schedule = drop_row(self.load_schedule(), item)
+        save_schedule_file(self.schedule_file, schedule)
+        self._schedule = schedule
+        self._schedule_mtime = os.path.getmtime(self.schedule_file)
+
+    async def seek_to_air_position(self, source, started_at, timeout=1.0):
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            status = await self.call("get_media_input_status", source)
+            if status.media_duration:
+                break
+            await asyncio.sleep(0.05)
+        await self.call("set_media_input_cursor", source, int((time.time() - started_at) * 1000))
+
+    async def play(self, file_path, item, started_at=None, deck=None):
+        """Loads the file on the next deck, puts it on air and waits for the end.
+
+        ``started_at``/``deck`` come from a checkpoint when resuming after a
+        restart; the clip is then seeked to where the channel should be now.
+        """
+        if deck is not None and deck in self.sources:
+            self.deck = self.sources.index(deck)
+        source = self.sources[self.deck % len(self.sources)]
+        scene = self.scenes[self.deck % len(self.scenes)] if self.scenes else None
+        self.deck += 1
+
+        await self.call("set_input_settings", source, {'local_file': os.path.abspath(file_path)}, True)
+        if scene:
+            await self.call("set_current_program_scene", scene)
+        if started_at is not None:
+            await self.seek_to_air_position(source, started_at)
+        else:
+            started_at = time.time()
+        playout_state.save_state(item, file_path, source, started_at, self.state_file)
+        if self.last_clip_end is not None:
+            metrics.TRANSITION_GAP_SECONDS.observe(time.perf_counter() - self.last_clip_end)
+            self.last_clip_end = None
+        self.log(f"Puštam: {os.path.basename(file_path)} ({source})")
+
+        await asyncio.sleep(POLL_INTERVAL)
+        while True:
+            status = await self.call("get_media_input_status", source)
+            if status.media_state == "OBS_MEDIA_STATE_ENDED":
+                self.last_clip_end = time.perf_counter()
+                return started_at
+            await asyncio.sleep(POLL_INTERVAL)
+
+    async def run(self):
+        self.log(f"Kanal pokrenut (raspored: {self.schedule_file}).")
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                # Greška jednog kanala ne sme da zaustavi ostale kanale
+                metrics.FAILURES_TOTAL.inc("channel")
+                self.log(f"Greška u kanalu: {e}")
+                await asyncio.sleep(5)
+
+    async def run_once(self):
+        """Handles the next schedule item: waits for it, plays it and removes it."""
+        schedule = self.load_schedule()
+        item = next_scheduled_item(schedule, self.recurring_state)
+        if item is None:
+            await asyncio.sleep(5)
+            return
+
+        name, link, duration = item['name'], item['link'], item['duration']
+        planned = planned_start(item.get('date', '2026-02-23'), item.get('startTime', '00:00'))
+        if planned is not None and planned > time.time():
+            # Dok čekamo, preuzimamo stavku unapred kroz zajednički pool
+            self.cache.prefetch(link)
+            await asyncio.sleep(min(POLL_INTERVAL, planned - time.time()))
+            return
+
+        planned_end = planned + parse_duration(duration) if planned is not None else None
+        if planned is not None:
+            metrics.SCHEDULE_LAG_SECONDS.observe(max(0.0, time.time() - planned))
+        self.log(f"Vreme je za: {name}")
+
+        if link.upper().startswith("SCENE:"):
+            reason = None
+            try:
+                await self.call("set_current_program_scene", link[6:].strip())
+            except Exception as e:
+                reason = str(e)
+                self.log(f"Greška pri promeni scene: {e}")
+            now = time.time()
+            self.asrun.record(name, link, planned, planned_end, now, now, channel=self.name,
+                              status="scene" if reason is None else "failed", reason=reason)
+            self.pop_schedule(item)
+            return
+
+        state, self.resume_state = self.resume_state, None
+        if playout_state.ended_while_down(state, item, parse_duration(duration)):
+            # Klip se završio dok kanal nije radio: ne puštamo ga ponovo od početka
+            self.log(f"'{name}' se završio dok kanal nije radio, prelazim na sledeću stavku.")
+            self.asrun.record(name, link, planned, planned_end, state["started_at"],
+                              state["started_at"] + parse_duration(duration),
+                              source_path=state.get("file_path"), channel=self.name,
+                              status="interrupted", reason="Kanal nije radio do kraja klipa")
+            playout_state.clear_state(self.state_file)
+            self.pop_schedule(item)
+            return
+        if playout_state.resume_offset(state, item, parse_duration(duration)) is not None:
+            self.log(f"Nastavak posle restarta: {name}")
+            file_path, cache = state["file_path"], "local"
+            resume = (state["started_at"], state.get("source"))
+        else:
+            file_path, cache = await self.cache.fetch(link)
+            resume = (None, None)
+
+        if file_path and os.path.exists(file_path):
+            if not item.get('rule'):
+                following = next_scheduled_item(drop_row(schedule, item), self.recurring_state)
+                if following is not None:
+                    self.cache.prefetch(following['link'])
+            started_at, reason = time.time(), None
+            try:
+                started_at = await self.play(file_path, item, *resume)
+            except Exception as e:
+                metrics.FAILURES_TOTAL.inc("obs_play")
+                self.client = None
+                reason = str(e)
+                self.log(f"Greška prilikom kontrole OBS-a: {e}")
+            playout_state.clear_state(self.state_file)
+            self.asrun.record(name, link, planned, planned_end, started_at, time.time(),
+                              source_path=file_path, cache=cache, channel=self.name,
+                              status="aired" if reason is None else "failed", reason=reason)
+        else:
+            metrics.FAILURES_TOTAL.inc("fetch")
+            self.log(f"Greška: Nije moguće preuzeti ili pronaći {name}")
+            now = time.time()
+            self.asrun.record(name, link, planned, planned_end, now, now, channel=self.name,
+                              status="failed", reason="Nije moguće preuzeti ili pronaći fajl")
+        self.pop_schedule(item)
+
+
+def load_channels(path=CHANNELS_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+async def write_metrics_periodically(interval=5):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(metrics.REGISTRY.write_textfile, metrics.METRICS_FILE)
+        except OSError as e:
+            print(f"Greška pri upisu metrika: {e}")
+
+
+async def run_channels(configs):
+    """Runs every configured channel on a single event loop."""
+    cache = MediaCache()
+    channels = [Channel(config, cache) for config in configs]
+    print(f"Pokrećem {len(channels)} kanala.")
+    try:
+        await asyncio.gather(write_metrics_periodically(), *(channel.run() for channel in channels))
+    finally:
+        for channel in channels:
+            channel.asrun.flush()
+            channel.obs_executor.shutdown(wait=False, cancel_futures=True)
+        cache.executor.shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == "__main__":
+    if not os.path.exists('videos'):
+        os.makedirs('videos')
+
+    channels_file = sys.argv[1] if len(sys.argv) > 1 else CHANNELS_FILE
+    try:
+        asyncio.run(run_channels(load_channels(channels_file)))
+    except KeyboardInterrupt:
+        print("Gasi se TV program...")
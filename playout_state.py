@@ -0,0 +1,72 @@
+import os
+import json
+import time
+
+# Checkpoint stavke koja je trenutno na programu, da bi se posle restarta
+# nastavilo od mesta na kome bi program sada bio.
+STATE_FILE = "playout_state.json"
+
+
+def save_state(item, file_path, source, started_at, path=STATE_FILE):
+    """Atomically records the item that just went on air."""
+    state = {
+        "date": item.get("date"),
+        "startTime": item.get("startTime"),
+        "name": item.get("name"),
+        "link": item.get("link"),
+        "duration": item.get("duration"),
+        "file_path": file_path,
+        "source": source,
+        "started_at": started_at,
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def load_state(path=STATE_FILE):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def clear_state(path=STATE_FILE):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _same_entry(state, item):
+    if not state or not item:
+        return False
+    return all(state.get(key) == item.get(key) for key in ("date", "startTime", "link"))
+
+
+def resume_offset(state, item, duration_seconds, now=None):
+    """Returns how many seconds into ``item`` we should be on air, or None.
+
+    The checkpoint only applies if it describes the same schedule entry, its
+    file is still on disk and the clip would not have ended by now. Without a
+    known duration we cannot tell where the clip ends, so it is not resumed.
+    """
+    if not _same_entry(state, item) or not duration_seconds:
+        return None
+    if not state.get("file_path") or not os.path.exists(state["file_path"]):
+        return None
+    offset = (now if now is not None else time.time()) - state.get("started_at", 0)
+    if offset < 0 or offset >= duration_seconds:
+        return None
+    return offset
+
+
+def ended_while_down(state, item, duration_seconds, now=None):
+    """Returns True if the checkpointed ``item`` would have finished while the player was down."""
+    if not _same_entry(state, item) or not duration_seconds:
+        return False
+    return (now if now is not None else time.time()) - state.get("started_at", 0) >= duration_seconds
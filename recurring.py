@@ -0,0 +1,285 @@
+import os
+import re
+import json
+import time
+import heapq
+import hashlib
+from datetime import date, datetime, timedelta
+
+# Ponavljajuće stavke u schedule.txt koriste isti format od 5 polja, ali umesto
+# datuma imaju pravilo:
+#
+#   "RULE:daily","20:00","Naruto","SERIES:naruto","0:22:00"
+#   "RULE:weekdays@2026-03-01..2026-06-30","07:30","Jutarnji blok","video1.mp4","0:30:00"
+#   "RULE:weekly:MON,WED","18:00","Pokemon","SERIES:pokemon","0:22:00"
+#
+# Link može biti fiksna stavka (isto kao kod običnih redova) ili SERIES:<ime>,
+# što znači sledeću epizodu iz scripts/<ime>.txt. Posle poslednje epizode serija
+# kreće ispočetka; pravilo čija serija nema nijednu epizodu se ne emituje.
+# Pojedinačni termin se otkazuje izuzetkom sa istim imenom i vremenom:
+#
+#   "EXCEPT:2026-03-04","18:00","Pokemon","",""
+RULE_PREFIX = "RULE:"
+EXCEPT_PREFIX = "EXCEPT:"
+SERIES_PREFIX = "SERIES:"
+SERIES_DIR = "scripts"
+STATE_FILE = "recurring_state.json"
+WEEKDAYS = ("MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN")
+
+
+def parse_duration(duration_str):
+    """Pretvara trajanje 'H:MM:SS' ili 'M:SS' u sekunde."""
+    seconds = 0.0
+    try:
+        for part in duration_str.split(':'):
+            seconds = seconds * 60 + float(part)
+    except (ValueError, AttributeError):
+        return 0.0
+    return seconds
+
+
+def normalize_time(value):
+    """Returns 'H:MM' as zero-padded 'HH:MM' (or the value unchanged if it is not a time)."""
+    try:
+        hour, minute = (int(x) for x in value.split(":"))
+    except (ValueError, AttributeError):
+        return value
+    return f"{hour:02d}:{minute:02d}"
+
+
+class Rule:
+    """One recurring schedule row."""
+
+    def __init__(self, item):
+        spec = item["date"][len(RULE_PREFIX):]
+        freq, _, bounds = spec.partition("@")
+        first, _, until = bounds.partition("..")
+        self.first = date.fromisoformat(first) if first else None
+        self.until = date.fromisoformat(until) if until else None
+
+        freq = freq.strip().lower()
+        if freq == "daily":
+            self.days = set(range(7))
+        elif freq == "weekdays":
+            self.days = set(range(5))
+        elif freq.startswith("weekly:"):
+            self.days = {WEEKDAYS.index(d.strip().upper()) for d in freq[len("weekly:"):].split(",")}
+        else:
+            raise ValueError(f"Nepoznato pravilo: {item['date']}")
+        if not self.days:
+            raise ValueError(f"Pravilo bez dana: {item['date']}")
+
+        self.hour, self.minute = (int(x) for x in item["startTime"].split(":"))
+        if not (0 <= self.hour < 24 and 0 <= self.minute < 60):
+            raise ValueError(f"Neispravno vreme pravila: {item['startTime']}")
+        self.start_time = f"{self.hour:02d}:{self.minute:02d}"
+        self.item = item
+        self.duration = parse_duration(item["duration"])
+        self.series = item["link"][len(SERIES_PREFIX):].strip() if item["link"].upper().startswith(SERIES_PREFIX) else None
+        raw = "|".join(item.get(k, "") for k in ("date", "startTime", "name", "link"))
+        self.key = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+    def epochs(self, start_epoch, exceptions=()):
+        """Yields (epoch, date) of every occurrence at or after ``start_epoch``, lazily."""
+        day = date.fromtimestamp(start_epoch)
+        if self.first and day < self.first:
+            day = self.first
+        while self.until is None or day <= self.until:
+            if day.weekday() in self.days:
+                epoch = datetime(day.year, day.month, day.day, self.hour, self.minute).timestamp()
+                if epoch >= start_epoch and (day.isoformat(), self.start_time, self.item["name"]) not in exceptions:
+                    yield epoch, day
+            day += timedelta(days=1)
+
+
+def split_schedule(items):
+    """Splits parsed schedule rows into (literal items, rules, exceptions)."""
+    literal, rules, exceptions = [], [], set()
+    for item in items:
+        date_field = item.get("date", "")
+        if date_field.startswith(RULE_PREFIX):
+            try:
+                rules.append(Rule(item))
+            except ValueError as e:
+                print(f"Greška u pravilu rasporeda: {e}")
+        elif date_field.startswith(EXCEPT_PREFIX):
+            # Rule.epochs traži izuzetke po vremenu u obliku HH:MM, pa i ručno upisano "7:30" mora da se poklopi
+            exceptions.add((date_field[len(EXCEPT_PREFIX):], normalize_time(item.get("startTime", "")),
+                            item.get("name", "")))
+        else:
+            literal.append(item)
+    return literal, rules, exceptions
+
+
+_series_cache = {}
+
+
+def series_episodes(series):
+    """Returns [(title, link)] parsed from scripts/<series>.txt (cached by mtime)."""
+    path = os.path.join(SERIES_DIR, f"{series}.txt")
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return []
+    cached = _series_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    episodes = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if " | " in line:
+                title, link = line.split(" | ", 1)
+                if title.strip().startswith("TEKST"):
+                    continue
+                episodes.append([title.strip(), link.strip()])
+            elif episodes and line.strip() and not re.fullmatch(r"-+", line.strip()):
+                # Dugački linkovi su u fajlu prelomljeni u sledeći red
+                episodes[-1][1] += line.strip()
+    episodes = [tuple(e) for e in episodes]
+    _series_cache[path] = (mtime, episodes)
+    return episodes
+
+
+def load_state(path=STATE_FILE):
+    if not os.path.exists(path):
+        return {"consumed": {}, "series": {}}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+    state.setdefault("consumed", {})
+    state.setdefault("series", {})
+    return state
+
+
+def save_state(state, path=STATE_FILE):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+_warned_series = set()
+
+
+def _playable(rules):
+    """Drops rules whose series has no episodes, since the player could not resolve them."""
+    playable = []
+    for rule in rules:
+        if rule.series is not None and not series_episodes(rule.series):
+            if rule.series not in _warned_series:
+                _warned_series.add(rule.series)
+                print(f"Serija '{rule.series}' nema epizoda ({SERIES_DIR}/{rule.series}.txt), pravilo se preskače.")
+            continue
+        playable.append(rule)
+    return playable
+
+
+def _make_item(rule, epoch, day, episode):
+    item = {
+        "date": day.isoformat(),
+        "startTime": rule.start_time,
+        "name": rule.item["name"],
+        "link": rule.item["link"],
+        "duration": rule.item["duration"],
+        "rule": rule.key,
+        "epoch": epoch,
+    }
+    if rule.series is not None:
+        episodes = series_episodes(rule.series)
+        # Posle poslednje epizode kreće se ispočetka (_playable garantuje da lista nije prazna)
+        episode %= len(episodes)
+        title, link = episodes[episode]
+        item["series"] = rule.series
+        item["episode"] = episode
+        item["name"] = f"{rule.item['name']} - {title}"
+        item["link"] = link
+    return item
+
+
+def _tagged(index, epochs):
+    for epoch, day in epochs:
+        yield epoch, index, day
+
+
+def _merged(rules, starts, exceptions):
+    """Merges the per-rule occurrence generators into one time-ordered stream."""
+    return heapq.merge(*(_tagged(i, rule.epochs(start, exceptions))
+                         for i, (rule, start) in enumerate(zip(rules, starts))))
+
+
+def _rule_start(rule, state, now):
+    # Preskačemo termine koji su već emitovani ili su se u potpunosti završili
+    return max(now - rule.duration, state["consumed"].get(rule.key, 0) + 1)
+
+
+def occurrences(rules, exceptions, start, end, state, now=None):
+    """Lazily yields expanded occurrence items with start in [start, end], in time order.
+
+    Series episodes are numbered from the saved cursor, counting the
+    occurrences between now and ``start`` without materialising them.
+    """
+    now = time.time() if now is None else now
+    rules = _playable(rules)
+    counters = dict(state["series"])
+    if start > now:
+        for epoch, i, _ in _merged(rules, [_rule_start(r, state, now) for r in rules], exceptions):
+            if epoch >= start:
+                break
+            if rules[i].series is not None:
+                counters[rules[i].series] = counters.get(rules[i].series, 0) + 1
+
+    starts = [max(start, _rule_start(r, state, now)) for r in rules]
+    for epoch, i, day in _merged(rules, starts, exceptions):
+        if epoch > end:
+            return
+        rule = rules[i]
+        episode = counters.get(rule.series, 0) if rule.series is not None else None
+        if rule.series is not None:
+            counters[rule.series] = episode + 1
+        yield _make_item(rule, epoch, day, episode)
+
+
+def next_occurrence(rules, exceptions, state, now=None):
+    """Returns the next occurrence the player has not aired yet, or None."""
+    now = time.time() if now is None else now
+    rules = _playable(rules)
+    if not rules:
+        return None
+    starts = [_rule_start(r, state, now) for r in rules]
+    first = next(_merged(rules, starts, exceptions), None)
+    if first is None:
+        return None
+    epoch, i, day = first
+    rule = rules[i]
+    episode = state["series"].get(rule.series, 0) if rule.series is not None else None
+    return _make_item(rule, epoch, day, episode)
+
+
+def next_scheduled_item(schedule, state, now=None):
+    """Vraća stavku koja je sledeća na redu (ili None).
+
+    To je prvi obični red ili sledeći neemitovani termin nekog ponavljajućeg
+    pravila, šta god je ranije; termini se računaju samo po potrebi.
+    """
+    literal, rules, exceptions = split_schedule(schedule)
+    item = literal[0] if literal else None
+    occurrence = next_occurrence(rules, exceptions, state, now)
+    if occurrence is not None and (item is None or (occurrence['date'], occurrence['startTime'])
+                                   < (item.get('date', '2026-02-23'), item.get('startTime', '00:00'))):
+        return occurrence
+    return item
+
+
+def consume(state, item, path=STATE_FILE):
+    """Marks an occurrence as aired and advances its series to the next episode."""
+    state["consumed"][item["rule"]] = item["epoch"]
+    if item.get("series") is not None:
+        episode = (item["episode"] + 1) % max(1, len(series_episodes(item["series"])))
+        if episode == 0:
+            print(f"Serija '{item['series']}' je došla do kraja, sledeće emitovanje kreće od prve epizode.")
+        state["series"][item["series"]] = episode
+    save_state(state, path)
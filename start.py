@@ -1,11 +1,14 @@
 import threading
 import time
 import os
-import re
 import json
 import obsws_python as obs
-from youtube_downloader import download_youtube_video
-from gdrive_downloader import download_gdrive_video
+import metrics
+from asrun_log import AsRunLog
+import playout_state
+import recurring
+from recurring import parse_duration, next_scheduled_item
+from control_plane import ControlPlane, drop_row
 
 # Konfiguracija OBS-a
 OBS_HOST = "127.0.0.1"
@@ -13,25 +16,97 @@ OBS_PORT = 4455
 OBS_PASSWORD = "[PASSWORD]"  # Ažurirano prema tvom OBS-u
 OBS_SOURCE_NAME = "TV_Video_Source"  # Ime Media Source-a u OBS-u
 SCHEDULE_FILE = "schedule.txt"
+SKIPPED = "Preskočeno"  # Razlog koji play_in_obs vraća kada operater preskoči klip
+
+def asrun_status(reason):
+    """Status za as-run log: preskakanje od strane operatera nije greška."""
+    if reason is None:
+        return "aired"
+    return "skipped" if reason == SKIPPED else "failed"
+
+def planned_start(date_str, start_time_str):
+    """Vraća zakazani početak kao epoch sekunde (ili None ako format nije validan)."""
+    try:
+        return time.mktime(time.strptime(f"{date_str} {start_time_str}", "%Y-%m-%d %H:%M"))
+    except ValueError:
+        return None
+
+def timed_download(source, downloader, link):
+    """Poziva downloader i beleži trajanje i protok preuzimanja."""
+    start = time.perf_counter()
+    file_path = downloader(link)
+    elapsed = time.perf_counter() - start
+    if file_path and os.path.exists(file_path):
+        metrics.DOWNLOAD_SECONDS.observe(elapsed, source)
+        if elapsed > 0:
+            metrics.DOWNLOAD_THROUGHPUT.observe(metrics.file_size(file_path) / elapsed, source)
+    else:
+        metrics.FAILURES_TOTAL.inc(f"download_{source}")
+    return file_path
+
+def fetch_media(link):
+    """Pronalazi lokalni fajl ili preuzima video za dati link.
+
+    Vraća (putanja, keš) gde je keš "local", "hit" ili "miss"; putanja je None
+    ako fajl nije moguće pronaći ni preuzeti.
+    """
+    fetch_start = time.time()
+    # Downloader-i (yt_dlp, gdown, http) se učitavaju tek kada zatrebaju, da bi start bio brz
+    if "youtube.com" in link or "youtu.be" in link:
+        from youtube_downloader import download_youtube_video
+        file_path = timed_download("youtube", download_youtube_video, link)
+    elif "drive.google.com" in link or "docs.google.com" in link:
+        from gdrive_downloader import download_gdrive_video
+        file_path = timed_download("gdrive", download_gdrive_video, link)
+    elif link.startswith(("http://", "https://")):
+        from http_downloader import download_http_video
+        file_path = timed_download("http", download_http_video, link)
+    else:
+        if os.path.exists(os.path.join('videos', link)):
+            return os.path.join('videos', link), "local"
+        if os.path.exists(link):
+            return link, "local"
+        return None, "local"
+
+    if not file_path or not os.path.exists(file_path):
+        return None, "miss"
+    # Fajl koji nije (pre)napisan tokom ovog preuzimanja je već bio u kešu
+    return file_path, "hit" if os.path.getctime(file_path) < fetch_start else "miss"
 
 class TVProgram:
-    def __init__(self):
+    def __init__(self, control=None):
+        # Control plane se deli sa API-jem kada rade u istom procesu (api.py)
+        self.control = control or ControlPlane(SCHEDULE_FILE)
         self.is_running = True
         self.obs_client = None
+        self.last_clip_end = None  # perf_counter trenutka kada je prethodni klip završen
+        self.clip_started_at = None  # wall-clock početka trenutnog klipa
+        self.asrun = AsRunLog()
+        self.resume_state = playout_state.load_state()
+        self.recurring_state = recurring.load_state()
 
     def connect_obs(self):
+        metrics.OBS_RECONNECTS_TOTAL.inc()
         try:
-            self.obs_client = obs.ReqClient(host=OBS_HOST, port=OBS_PORT, password=OBS_PASSWORD)
+            self.obs_client = metrics.InstrumentedClient(
+                obs.ReqClient(host=OBS_HOST, port=OBS_PORT, password=OBS_PASSWORD))
             print("Povezan sa OBS-om (v5)!")
             return True
         except Exception as e:
+            metrics.FAILURES_TOTAL.inc("obs_connect")
             print(f"Greška pri povezivanju sa OBS-om: {e}")
             return False
 
-    def play_in_obs(self, file_path):
+    def play_in_obs(self, file_path, item=None, started_at=None):
+        """Pušta fajl u OBS-u i čeka kraj. Vraća None ili opis greške.
+
+        Ako je zadat started_at (nastavak posle restarta), video se premotava na
+        poziciju na kojoj bi program sada bio.
+        """
+        self.clip_started_at = None
         if not self.obs_client:
             if not self.connect_obs():
-                return
+                return "OBS nije dostupan"
 
         abs_path = os.path.abspath(file_path)
         
@@ -54,6 +129,19 @@ class TVProgram:
             else:
                 # Podešavanje izvora na novi fajl (OBS v5 syntax)
                 self.obs_client.set_input_settings(OBS_SOURCE_NAME, {'local_file': abs_path}, True)
+
+            if started_at is not None:
+                self.seek_to_air_position(started_at)
+                self.clip_started_at = started_at
+            else:
+                self.clip_started_at = time.time()
+            if item is not None:
+                playout_state.save_state(item, file_path, OBS_SOURCE_NAME, self.clip_started_at)
+                self.control.set_player_state(status="playing", item=item, file=file_path,
+                                              started_at=self.clip_started_at)
+            if self.last_clip_end is not None:
+                metrics.TRANSITION_GAP_SECONDS.observe(time.perf_counter() - self.last_clip_end)
+                self.last_clip_end = None
             
             # Podešavanje zvuka
             try:
@@ -83,63 +171,94 @@ class TVProgram:
             
             # Sačekaj malo da se učita pa proveri status
             time.sleep(2)
-            self.wait_for_video_finish()
+            return self.wait_for_video_finish()
             
         except Exception as e:
+            metrics.FAILURES_TOTAL.inc("obs_play")
             print(f"Greška prilikom kontrole OBS-a: {e}")
+            return str(e)
+
+    def seek_to_air_position(self, started_at, timeout=1.0):
+        """Čeka da OBS učita medij i premotava ga na trenutnu poziciju u programu."""
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            try:
+                status = self.obs_client.get_media_input_status(OBS_SOURCE_NAME)
+                if status.media_duration:
+                    break
+            except Exception:
+                pass
+            time.sleep(0.05)
+        cursor_ms = int((time.time() - started_at) * 1000)
+        try:
+            self.obs_client.set_media_input_cursor(OBS_SOURCE_NAME, cursor_ms)
+            print(f"Nastavljam od {cursor_ms // 1000}s.")
+        except Exception as e:
+            metrics.FAILURES_TOTAL.inc("obs_seek")
+            print(f"Greška pri premotavanju: {e}")
 
     def wait_for_video_finish(self):
         while self.is_running:
             try:
+                version = self.control.version
                 # Provera statusa medija
                 response = self.obs_client.get_media_input_status(OBS_SOURCE_NAME)
                 if response.media_state == "OBS_MEDIA_STATE_ENDED":
+                    self.last_clip_end = time.perf_counter()
                     print("Video završen.")
-                    break
-                time.sleep(1)
+                    return None
+                self.control.wait(version, 1)
+                command = self.control.take_command()
+                # Komanda važi samo za klip za koji je poslata; zastarele se odbacuju
+                if command and command[0] == "skip" and command[1].get("started_at") == self.clip_started_at:
+                    self.obs_client.trigger_media_input_action(OBS_SOURCE_NAME, 'OBS_WEBSOCKET_MEDIA_INPUT_ACTION_STOP')
+                    self.last_clip_end = time.perf_counter()
+                    print("Video preskočen (komanda iz API-ja).")
+                    return SKIPPED
             except Exception as e:
+                metrics.FAILURES_TOTAL.inc("obs_status")
                 print(f"Greška pri proveri statusa: {e}")
-                break
+                return str(e)
+        return "Prekinuto"
 
     def parse_schedule(self):
-        """Čita schedule.txt i vraća listu stavki sa date i startTime."""
-        items = []
-        if not os.path.exists(SCHEDULE_FILE):
-            return items
-        
-        # Regex za format "date","startTime","name","link","duration"
-        pattern = re.compile(r'"([^"]*)","([^"]*)","([^"]*)","([^"]*)","([^"]*)"')
-        
-        with open(SCHEDULE_FILE, "r", encoding="utf-8") as f:
-            for line in f:
-                match = pattern.search(line)
-                if match:
-                    items.append({
-                        "date": match.group(1),
-                        "startTime": match.group(2),
-                        "name": match.group(3),
-                        "link": match.group(4),
-                        "duration": match.group(5)
-                    })
-        return items
+        """Vraća trenutni raspored iz control plane-a (bez čitanja fajla)."""
+        return self.control.snapshot()
 
     def save_schedule(self, schedule):
-        """Čuva listu nazad u fajl sa date i startTime."""
-        with open(SCHEDULE_FILE, "w", encoding="utf-8") as f:
-            for item in schedule:
-                f.write(f'"{item.get("date", "2026-02-23")}","{item.get("startTime", "00:00")}","{item["name"]}","{item["link"]}","{item["duration"]}"\n')
+        """Zamenjuje raspored; upis na disk radi control plane u pozadini."""
+        self.control.replace(schedule)
+
+    def wait(self, timeout):
+        """Spava najviše timeout sekundi, ali se budi čim API izmeni raspored ili pošalje komandu."""
+        self.control.wait(self.control.version, timeout)
+
+    def pop_item(self, item):
+        """Uklanja emitovanu stavku: termin pravila se beleži kao emitovan, običan red se briše iz fajla."""
+        if item.get('rule'):
+            recurring.consume(self.recurring_state, item)
+        else:
+            # Briše se baš emitovani red; ako ga je API u međuvremenu uklonio, ništa se ne briše
+            self.control.update(lambda schedule: (drop_row(schedule, item), None))
+
+    def observe_schedule_lag(self, planned):
+        """Beleži koliko kasnimo u odnosu na zakazano vreme početka."""
+        if planned is not None:
+            metrics.SCHEDULE_LAG_SECONDS.observe(max(0.0, time.time() - planned))
 
     def playback_thread(self):
         print("Playback nit pokrenuta (Multi-Day Scheduled Mode).")
         while self.is_running:
+            self.control.reload_if_changed()
             schedule = self.parse_schedule()
-            
-            if not schedule:
-                time.sleep(5)
-                continue
 
             # Uzimamo prvu stavku (pretpostavljamo da su sortirane po vremenu)
-            item = schedule[0]
+            item = next_scheduled_item(schedule, self.recurring_state)
+            if item is None:
+                self.control.set_player_state(status="idle")
+                self.wait(5)
+                continue
+
             date_str = item.get('date', '2026-02-23')
             start_time_str = item.get('startTime', '00:00')
             name = item['name']
@@ -152,14 +271,16 @@ class TVProgram:
             if now_date < date_str:
                 if int(time.time()) % 60 == 0:
                     print(f"Čekam na '{name}' zakazan za {date_str} {start_time_str} (Danas je: {now_date})")
-                time.sleep(1)
+                self.control.set_player_state(status="waiting", next=item)
+                self.wait(1)
                 continue
             
             # Ako je datum današnji, ali vreme je u budućnosti
             if now_date == date_str and now_time < start_time_str:
                 if int(time.time()) % 30 == 0:
                     print(f"Čekam na '{name}' (Danas {start_time_str}, Trenutno: {now_time})")
-                time.sleep(1)
+                self.control.set_player_state(status="waiting", next=item)
+                self.wait(1)
                 continue
             
             # Vreme je (ili je prošlo)
@@ -167,6 +288,9 @@ class TVProgram:
             duration = item['duration']
             
             print(f"\n[PROGRAM] Vreme je za: {name} (Zakazano: {date_str} {start_time_str})")
+            planned = planned_start(date_str, start_time_str)
+            planned_end = planned + parse_duration(duration) if planned is not None else None
+            self.observe_schedule_lag(planned)
             
             # Provera za promenu scene
             if link.upper().startswith("SCENE:"):
@@ -177,45 +301,95 @@ class TVProgram:
                     try:
                         self.obs_client.set_current_program_scene(scene_name)
                         print(f"Promenjena OBS scena na: {scene_name}")
+                        reason = None
                     except Exception as e:
                         print(f"Greška pri promeni scene: {e}")
+                        reason = str(e)
+                else:
+                    reason = "OBS nije dostupan"
+                now = time.time()
+                self.asrun.record(name, link, planned, planned_end, now, now,
+                                  status="scene" if reason is None else "failed", reason=reason)
                 
                 # Ukloni i nastavi
-                self.save_schedule(schedule[1:])
+                self.pop_item(item)
                 continue
 
-            file_path = None
-            if "youtube.com" in link or "youtu.be" in link:
-                file_path = download_youtube_video(link)
-            elif "drive.google.com" in link or "docs.google.com" in link:
-                file_path = download_gdrive_video(link)
+            resume_from = None
+            state, self.resume_state = self.resume_state, None
+            if playout_state.ended_while_down(state, item, parse_duration(duration)):
+                # Klip se završio dok plejer nije radio: ne puštamo ga ponovo od početka
+                print(f"'{name}' se završio dok plejer nije radio, prelazim na sledeću stavku.")
+                self.asrun.record(name, link, planned, planned_end, state["started_at"],
+                                  state["started_at"] + parse_duration(duration),
+                                  source_path=state.get("file_path"), status="interrupted",
+                                  reason="Plejer nije radio do kraja klipa")
+                playout_state.clear_state()
+                self.pop_item(item)
+                continue
+            offset = playout_state.resume_offset(state, item, parse_duration(duration))
+            if offset is not None:
+                # Restart usred klipa: ne preuzimamo ponovo, nastavljamo gde bi program bio
+                print(f"Nastavak posle restarta: {name} (+{int(offset)}s)")
+                file_path, cache = state["file_path"], "local"
+                resume_from = state["started_at"]
             else:
-                if os.path.exists(os.path.join('videos', link)):
-                    file_path = os.path.join('videos', link)
-                elif os.path.exists(link):
-                    file_path = link
+                self.control.set_player_state(status="fetching", item=item)
+                file_path, cache = fetch_media(link)
             
             if file_path and os.path.exists(file_path):
-                self.play_in_obs(file_path)
+                reason = self.play_in_obs(file_path, item, resume_from)
+                if not self.is_running:
+                    # Gašenje usred klipa: checkpoint i raspored ostaju za nastavak
+                    break
+                self.control.set_player_state(status="idle")
+                playout_state.clear_state()
+                self.asrun.record(name, link, planned, planned_end,
+                                  self.clip_started_at or time.time(), time.time(),
+                                  source_path=file_path, cache=cache,
+                                  status=asrun_status(reason), reason=reason)
                 # Ukloni iz fajla nakon puštanja
-                self.save_schedule(self.parse_schedule()[1:])
+                self.pop_item(item)
             else:
+                metrics.FAILURES_TOTAL.inc("fetch")
                 print(f"Greška: Nije moguće preuzeti ili pronaći {name}")
-                self.save_schedule(schedule[1:])
+                now = time.time()
+                self.asrun.record(name, link, planned, planned_end, now, now,
+                                  status="failed", reason="Nije moguće preuzeti ili pronaći fajl")
+                self.pop_item(item)
             
             time.sleep(1)
 
-    def run(self):
+    def write_metrics(self):
+        try:
+            metrics.REGISTRY.write_textfile(metrics.METRICS_FILE)
+        except OSError as e:
+            print(f"Greška pri upisu metrika: {e}")
+
+    def start(self):
+        """Pokreće playback nit i vraća je (koristi je i api.py kada plejer radi u istom procesu)."""
         t1 = threading.Thread(target=self.playback_thread, daemon=True)
         t1.start()
+        return t1
+
+    def stop(self):
+        self.is_running = False
+        self.asrun.flush()
+        self.control.flush()
+
+    def run(self):
+        self.start()
         
         print("TV Program radi. Koristite Web UI za upravljanje planom (schedule.txt).")
         try:
             while self.is_running:
                 time.sleep(1)
+                # Metrike upisujemo van playback niti da ne usporavamo reprodukciju
+                if int(time.time()) % 5 == 0:
+                    self.write_metrics()
         except KeyboardInterrupt:
-            self.is_running = False
             print("Gasi se TV program...")
+            self.stop()
 
 if __name__ == "__main__":
     if not os.path.exists('videos'):
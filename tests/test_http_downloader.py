@@ -0,0 +1,147 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import http_downloader
+
+SEGMENT = 64 * 1024
+DATA = os.urandom(5 * SEGMENT + 1234)
+
+
+class MediaHandler(BaseHTTPRequestHandler):
+    """Serves ``server.data`` at /video.mp4, with optional Range support."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(self.headers.get("Range"))
+        if self.path.startswith("/media/"):
+            # Relativni Location bez vodeće kose crte
+            self.send_response(302)
+            if self.path == "/media/moved":
+                self.send_header("Location", "../video.mp4")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        data = server.data
+        range_header = self.headers.get("Range")
+        if range_header and server.ranges:
+            start, end = (int(x) for x in range_header[len("bytes="):].split("-"))
+            end = min(end, len(data) - 1)
+            body = data[start:end + 1]
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        else:
+            body = data
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        if server.etag:
+            self.send_header("ETag", f'"{server.etag}"')
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class HttpDownloaderTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), MediaHandler)
+        self.server.data = DATA
+        self.server.ranges = True
+        self.server.etag = hashlib.md5(DATA).hexdigest()
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/video.mp4"
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.tmp.name, "video.mp4")
+        patcher = mock.patch.object(http_downloader, "SEGMENT_SIZE", SEGMENT)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def download(self):
+        return http_downloader.download_http_video(self.url, self.tmp.name, connections=3)
+
+    def read_output(self):
+        with open(self.output, "rb") as f:
+            return f.read()
+
+    def test_segmented_download(self):
+        self.assertEqual(self.download(), self.output)
+        self.assertEqual(self.read_output(), DATA)
+        self.assertFalse(os.path.exists(self.output + ".part"))
+        self.assertFalse(os.path.exists(self.output + ".part.json"))
+        # Probni zahtev i po jedan zahtev za svaki deo
+        self.assertEqual(len(self.server.requests), 1 + 6)
+
+    def test_resume_from_partial_download(self):
+        part_path = self.output + ".part"
+        with open(part_path, "wb") as f:
+            f.write(DATA[:2 * SEGMENT])
+            f.truncate(len(DATA))
+        with open(part_path + ".json", "w", encoding="utf-8") as f:
+            json.dump({"url": self.url, "size": len(DATA), "etag": f'"{self.server.etag}"', "done": [0, 1]}, f)
+
+        self.assertEqual(self.download(), self.output)
+        self.assertEqual(self.read_output(), DATA)
+        fetched = set(self.server.requests[1:])
+        self.assertNotIn(f"bytes=0-{SEGMENT - 1}", fetched)
+        self.assertNotIn(f"bytes={SEGMENT}-{2 * SEGMENT - 1}", fetched)
+        self.assertEqual(len(fetched), 4)
+
+    def test_partial_download_of_changed_file_restarts(self):
+        part_path = self.output + ".part"
+        with open(part_path, "wb") as f:
+            f.write(b"\0" * len(DATA))
+        with open(part_path + ".json", "w", encoding="utf-8") as f:
+            json.dump({"url": self.url, "size": len(DATA), "etag": '"stale"', "done": [0, 1, 2, 3, 4, 5]}, f)
+
+        self.assertEqual(self.download(), self.output)
+        self.assertEqual(self.read_output(), DATA)
+
+    def test_md5_mismatch_is_rejected(self):
+        self.server.etag = hashlib.md5(b"something else").hexdigest()
+        self.assertIsNone(self.download())
+        self.assertFalse(os.path.exists(self.output))
+
+    def test_size_mismatch_is_rejected(self):
+        self.server.ranges = False
+        self.server.etag = None
+        # Server tvrdi da je fajl veći nego što ga zapravo šalje
+        with mock.patch.object(http_downloader, "_probe",
+                               return_value=(self.url, len(DATA) + 10, False, None)):
+            self.assertIsNone(self.download())
+        self.assertFalse(os.path.exists(self.output))
+
+    def test_fallback_when_range_is_ignored(self):
+        self.server.ranges = False
+        self.assertEqual(self.download(), self.output)
+        self.assertEqual(self.read_output(), DATA)
+        # Probni zahtev i jedan običan GET
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertIsNone(self.server.requests[1])
+
+    def test_relative_redirect(self):
+        self.url = self.url.replace("/video.mp4", "/media/moved")
+        self.assertEqual(self.download(), self.output)
+        self.assertEqual(self.read_output(), DATA)
+
+    def test_redirect_without_location_fails_cleanly(self):
+        self.url = self.url.replace("/video.mp4", "/media/broken")
+        self.assertIsNone(self.download())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import recurring
+
+# Fiksno "sada": nedelja 1. mart 2026. u podne
+NOW = datetime(2026, 3, 1, 12, 0).timestamp()
+
+
+def epoch(day, hour=0, minute=0):
+    return datetime(2026, 3, day, hour, minute).timestamp()
+
+
+def row(date, start_time, name, link, duration="0:22:00"):
+    return {"date": date, "startTime": start_time, "name": name, "link": link, "duration": duration}
+
+
+def empty_state():
+    return {"consumed": {}, "series": {}}
+
+
+class RecurringTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = mock.patch.object(recurring, "SERIES_DIR", self.tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.write_series("naruto", ["Ep1", "Ep2", "Ep3"])
+        self.state_path = os.path.join(self.tmp.name, "state.json")
+
+    def write_series(self, series, titles):
+        with open(os.path.join(self.tmp.name, f"{series}.txt"), "w", encoding="utf-8") as f:
+            for i, title in enumerate(titles):
+                f.write(f"{title} | https://example.com/{series}/{i}.mp4\n")
+
+    def expand(self, schedule, start, end, state=None):
+        _, rules, exceptions = recurring.split_schedule(schedule)
+        return list(recurring.occurrences(rules, exceptions, start, end, state or empty_state(), now=NOW))
+
+    def test_series_episodes_are_counted_up_to_the_window(self):
+        schedule = [row("RULE:daily", "20:00", "Naruto", "SERIES:naruto")]
+        # 1. i 2. mart troše Ep1 i Ep2, pa 3. mart dobija Ep3 iako se prvi dani ne vraćaju
+        items = self.expand(schedule, epoch(3), epoch(3, 23, 59))
+        self.assertEqual([(i["date"], i["name"], i["episode"]) for i in items],
+                         [("2026-03-03", "Naruto - Ep3", 2)])
+        self.assertEqual(items[0]["link"], "https://example.com/naruto/2.mp4")
+
+    def test_series_wraps_around_after_last_episode(self):
+        schedule = [row("RULE:daily", "20:00", "Naruto", "SERIES:naruto")]
+        items = self.expand(schedule, NOW, epoch(5, 23, 59))
+        self.assertEqual([i["name"] for i in items],
+                         ["Naruto - Ep1", "Naruto - Ep2", "Naruto - Ep3", "Naruto - Ep1", "Naruto - Ep2"])
+
+    def test_rule_with_missing_series_is_not_expanded(self):
+        schedule = [row("RULE:daily", "20:00", "Nema", "SERIES:missing")]
+        self.assertEqual(self.expand(schedule, NOW, epoch(5)), [])
+
+    def test_exception_cancels_occurrence_without_using_an_episode(self):
+        schedule = [
+            row("RULE:weekly:MON,WED", "7:30", "Naruto", "SERIES:naruto"),
+            row("EXCEPT:2026-03-02", "7:30", "Naruto", "", ""),
+        ]
+        items = self.expand(schedule, NOW, epoch(9, 23, 59))
+        self.assertEqual([(i["date"], i["startTime"], i["episode"]) for i in items],
+                         [("2026-03-04", "07:30", 0), ("2026-03-09", "07:30", 1)])
+
+    def test_rule_bounds(self):
+        schedule = [row("RULE:daily@2026-03-03..2026-03-04", "10:00", "Blok", "blok.mp4")]
+        items = self.expand(schedule, NOW, epoch(10))
+        self.assertEqual([i["date"] for i in items], ["2026-03-03", "2026-03-04"])
+
+    def test_invalid_rule_time_is_dropped(self):
+        _, rules, _ = recurring.split_schedule([row("RULE:daily", "24:00", "X", "x.mp4")])
+        self.assertEqual(rules, [])
+
+    def test_next_occurrence_skips_consumed_and_finished_occurrences(self):
+        schedule = [row("RULE:daily", "11:50", "Vesti", "vesti.mp4", "0:20:00")]
+        _, rules, exceptions = recurring.split_schedule(schedule)
+        state = empty_state()
+
+        # Termin od 11:50 još traje u 12:00, pa je i dalje na redu
+        item = recurring.next_occurrence(rules, exceptions, state, now=NOW)
+        self.assertEqual((item["date"], item["startTime"]), ("2026-03-01", "11:50"))
+
+        # Kada je emitovan, sledeći je sutrašnji
+        recurring.consume(state, item, self.state_path)
+        item = recurring.next_occurrence(rules, exceptions, state, now=NOW)
+        self.assertEqual(item["date"], "2026-03-02")
+
+        # Termin koji se u potpunosti završio dok plejer nije radio se preskače
+        item = recurring.next_occurrence(rules, exceptions, empty_state(), now=epoch(1, 12, 15))
+        self.assertEqual(item["date"], "2026-03-02")
+
+    def test_consume_advances_and_wraps_series(self):
+        schedule = [row("RULE:daily", "20:00", "Naruto", "SERIES:naruto")]
+        _, rules, exceptions = recurring.split_schedule(schedule)
+        state = empty_state()
+        aired = []
+        for _ in range(4):
+            item = recurring.next_occurrence(rules, exceptions, state, now=NOW)
+            aired.append((item["date"], item["name"]))
+            recurring.consume(state, item, self.state_path)
+        self.assertEqual(aired, [("2026-03-01", "Naruto - Ep1"), ("2026-03-02", "Naruto - Ep2"),
+                                 ("2026-03-03", "Naruto - Ep3"), ("2026-03-04", "Naruto - Ep1")])
+        self.assertEqual(recurring.load_state(self.state_path)["series"], {"naruto": 1})
+
+    def test_next_scheduled_item_orders_rules_against_literal_rows(self):
+        schedule = [
+            row("RULE:daily", "20:00", "Naruto", "SERIES:naruto"),
+            row("2026-03-01", "18:00", "Film", "film.mp4"),
+            row("2026-03-01", "21:00", "Kasni film", "kasni.mp4"),
+        ]
+        state = empty_state()
+        item = recurring.next_scheduled_item(schedule, state, now=NOW)
+        self.assertEqual(item["name"], "Film")
+
+        item = recurring.next_scheduled_item(schedule[:1] + schedule[2:], state, now=NOW)
+        self.assertEqual(item["name"], "Naruto - Ep1")
+        self.assertTrue(item["rule"])
+
+    def test_next_scheduled_item_without_anything_scheduled(self):
+        self.assertIsNone(recurring.next_scheduled_item([], empty_state(), now=NOW))
+
+
+if __name__ == "__main__":
+    unittest.main()
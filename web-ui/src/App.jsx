@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useRef, useMemo } from 'react';
+import React, { useState, useEffect, useRef, useMemo, useCallback } from 'react';
 import axios from 'axios';
 import {
   Plus, Trash2, Save, Play, Clock, Link as LinkIcon,
@@ -9,12 +9,17 @@ import {
   format, addDays, startOfWeek, endOfWeek,
   eachDayOfInterval, isSameDay, parseISO
 } from 'date-fns';
+import VirtualList from './VirtualList';
 
 const API_BASE = 'http://127.0.0.1:5000/api';
+const LIBRARY_PAGE_SIZE = 100;
+const LIBRARY_ROW_HEIGHT = 112;
 
 function App() {
   const [schedule, setSchedule] = useState([]);
-  const [library, setLibrary] = useState([]);
+  const [libraryPages, setLibraryPages] = useState({});
+  const [libraryTotal, setLibraryTotal] = useState(0);
+  const [gridViewport, setGridViewport] = useState({ top: 0, height: 0 });
   const [status, setStatus] = useState('');
   const [searchTerm, setSearchTerm] = useState('');
   const [currentDate, setCurrentDate] = useState(new Date());
@@ -24,9 +29,21 @@ function App() {
 
   const minuteHeight = hourHeight / 60;
 
+  // Schedule ids removed locally but not yet published
+  const removedIds = useRef(new Set());
+  const loadingPages = useRef(new Set());
+  const libraryQuery = useRef('');
+  const gridRef = useRef(null);
+  const gridHeaderRef = useRef(null);
+
+  const weekStart = useMemo(() => startOfWeek(currentDate, { weekStartsOn: 1 }), [currentDate]);
+  // One day before the week is loaded too, so spillover from Sunday night is shown on Monday
+  const weekRange = useMemo(() => ({
+    from: format(addDays(weekStart, -1), 'yyyy-MM-dd'),
+    to: format(addDays(weekStart, 6), 'yyyy-MM-dd')
+  }), [weekStart]);
+
   useEffect(() => {
-    fetchSchedule();
-    fetchLibrary();
     const animation = requestAnimationFrame(() => setEnabled(true));
     return () => {
       cancelAnimationFrame(animation);
@@ -34,33 +51,76 @@ function App() {
     };
   }, []);
 
-  const fetchSchedule = async () => {
+  const isChanged = (item) => !item.serverId || item.date !== item.origDate || item.startTime !== item.origStartTime;
+
+  const fetchSchedule = async (range, reset = false) => {
     try {
-      const res = await axios.get(`${API_BASE}/schedule`);
-      const data = res.data.map((item, idx) => ({
+      const res = await axios.get(`${API_BASE}/schedule`, { params: range });
+      const fetched = res.data.map(item => ({
         ...item,
-        id: `sched-${idx}-${Date.now()}-${Math.random()}`
+        id: `sched-${item.id}`,
+        serverId: item.id,
+        origDate: item.date,
+        origStartTime: item.startTime
       }));
-      setSchedule(data);
+      setSchedule(prev => {
+        if (reset) return fetched;
+        // Keep unpublished local edits on top of the freshly loaded range
+        const pending = prev.filter(isChanged);
+        const pendingIds = new Set(pending.map(item => item.serverId).filter(Boolean));
+        return [
+          ...fetched.filter(item => !pendingIds.has(item.serverId) && !removedIds.current.has(item.serverId)),
+          ...pending
+        ];
+      });
     } catch (err) {
       console.error("Error fetching schedule", err);
       setStatus('Offline');
     }
   };
 
-  const fetchLibrary = async () => {
+  useEffect(() => {
+    fetchSchedule(weekRange);
+  }, [weekRange]);
+
+  const fetchLibraryPage = async (page, term) => {
+    loadingPages.current.add(page);
     try {
-      const res = await axios.get(`${API_BASE}/videos`);
-      const data = res.data.map((v, i) => ({
-        ...v,
-        libId: `lib-${i}-${Math.random()}`
-      }));
-      setLibrary(data);
+      const res = await axios.get(`${API_BASE}/videos`, {
+        params: { offset: page * LIBRARY_PAGE_SIZE, limit: LIBRARY_PAGE_SIZE, q: term }
+      });
+      if (libraryQuery.current !== term) return;
+      setLibraryPages(prev => ({ ...prev, [page]: res.data.items }));
+      setLibraryTotal(res.data.total);
     } catch (err) {
       console.error("Error fetching library", err);
+    } finally {
+      loadingPages.current.delete(page);
     }
   };
 
+  useEffect(() => {
+    const timer = setTimeout(() => {
+      libraryQuery.current = searchTerm;
+      loadingPages.current.clear();
+      setLibraryPages({});
+      fetchLibraryPage(0, searchTerm);
+    }, 200);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
+
+  const libraryItemAt = (index) => libraryPages[Math.floor(index / LIBRARY_PAGE_SIZE)]?.[index % LIBRARY_PAGE_SIZE];
+
+  const onLibraryRange = useCallback((start, end) => {
+    const first = Math.floor(start / LIBRARY_PAGE_SIZE);
+    const last = Math.floor((end - 1) / LIBRARY_PAGE_SIZE);
+    for (let page = first; page <= last; page++) {
+      if (!libraryPages[page] && !loadingPages.current.has(page)) {
+        fetchLibraryPage(page, libraryQuery.current);
+      }
+    }
+  }, [libraryPages]);
+
   const timeToMinutes = (timeStr) => {
     if (!timeStr) return 0;
     const [h, m] = timeStr.split(':').map(Number);
@@ -156,9 +216,40 @@ function App() {
   }, [schedule]);
 
   const weekDays = useMemo(() => {
-    const start = startOfWeek(currentDate, { weekStartsOn: 1 });
-    return eachDayOfInterval({ start, end: addDays(start, 6) });
-  }, [currentDate]);
+    return eachDayOfInterval({ start: weekStart, end: addDays(weekStart, 6) });
+  }, [weekStart]);
+
+  // Blocks bucketed by day and hour so each visible slot is a single lookup
+  const blocksBySlot = useMemo(() => {
+    const slots = new Map();
+    processedSchedule.forEach(item => {
+      const key = `${item.uiDate}__${Math.floor(item.uiStart / 60)}`;
+      if (!slots.has(key)) slots.set(key, []);
+      slots.get(key).push(item);
+    });
+    return slots;
+  }, [processedSchedule]);
+
+  useEffect(() => {
+    const node = gridRef.current;
+    if (!node) return;
+    const update = () => setGridViewport({ top: node.scrollTop, height: node.clientHeight });
+    update();
+    const observer = new ResizeObserver(update);
+    observer.observe(node);
+    return () => observer.disconnect();
+  }, [enabled]);
+
+  // Only the hour rows inside the scroll viewport (plus one row of overscan) are rendered
+  const visibleHours = useMemo(() => {
+    const headerHeight = gridHeaderRef.current?.offsetHeight || 0;
+    const top = Math.max(0, gridViewport.top - headerHeight);
+    const first = Math.max(0, Math.floor(top / hourHeight) - 1);
+    const last = Math.min(23, Math.ceil((top + gridViewport.height) / hourHeight) + 1);
+    const hours = [];
+    for (let h = first; h <= last; h++) hours.push(h);
+    return hours;
+  }, [gridViewport, hourHeight]);
 
   const onDragEnd = (result) => {
     const { source, destination, draggableId } = result;
@@ -173,7 +264,7 @@ function App() {
     let movedItem;
 
     if (source.droppableId === 'library') {
-      const libItem = library.find(v => v.libId === draggableId);
+      const libItem = libraryItemAt(source.index);
       if (!libItem) return;
       movedItem = {
         ...libItem,
@@ -181,14 +272,12 @@ function App() {
         date: destDate,
         startTime: dropStartTime
       };
-      delete movedItem.libId;
       newSchedule.push(movedItem);
     } else {
       const index = newSchedule.findIndex(i => i.id === draggableId);
       if (index === -1) return;
       [movedItem] = newSchedule.splice(index, 1);
-      movedItem.date = destDate;
-      movedItem.startTime = dropStartTime;
+      movedItem = { ...movedItem, date: destDate, startTime: dropStartTime };
       newSchedule.push(movedItem);
     }
     setSchedule(newSchedule);
@@ -197,43 +286,70 @@ function App() {
   const handleSave = async () => {
     try {
       setStatus('Publishing...');
-      // Use unique original items with their NEW calculated Dates/Times
+      // Send only items whose NEW calculated Date/Time differs from what the server has
       const seen = new Set();
-      const toSave = [];
+      const remove = new Set(removedIds.current);
+      const add = [];
 
       processedSchedule.forEach(item => {
         const rootId = item.originalId || item.id;
-        if (!seen.has(rootId)) {
-          seen.add(rootId);
-          toSave.push({
-            name: item.name,
-            link: item.link,
-            duration: item.duration,
-            date: item.actualDate,
-            startTime: item.actualStartTime
-          });
-        }
-      });
-
-      toSave.sort((a, b) => {
-        if (a.date !== b.date) return a.date.localeCompare(b.date);
-        return timeToMinutes(a.startTime) - timeToMinutes(b.startTime);
+        if (seen.has(rootId)) return;
+        seen.add(rootId);
+        if (item.serverId && item.actualDate === item.origDate && item.actualStartTime === item.origStartTime) return;
+        if (item.serverId) remove.add(item.serverId);
+        add.push({
+          name: item.name,
+          link: item.link,
+          duration: item.duration,
+          date: item.actualDate,
+          startTime: item.actualStartTime
+        });
       });
 
-      await axios.post(`${API_BASE}/schedule`, toSave);
+      if (remove.size || add.length) {
+        await axios.patch(`${API_BASE}/schedule`, { remove: [...remove], add });
+      }
+      removedIds.current = new Set();
       setStatus('Success!');
       setTimeout(() => setStatus(''), 3000);
-      fetchSchedule();
+      fetchSchedule(weekRange, true);
     } catch (err) {
+      if (err.response?.status === 409) {
+        // Server schedule moved on (e.g. the player aired an item); reload and let the user redo the edit
+        removedIds.current = new Set();
+        setStatus('Schedule changed on server, reloaded');
+        fetchSchedule(weekRange, true);
+        return;
+      }
       setStatus('Error');
     }
   };
 
   const handleRemove = (id) => {
+    const removed = schedule.find(item => item.id === id);
+    if (removed?.serverId) removedIds.current.add(removed.serverId);
     setSchedule(schedule.filter(item => item.id !== id));
     if (selectedItem?.id === id) setSelectedItem(null);
   };
 
+  const renderLibraryCard = (item, provided, snapshot) => (
+    <div
+      ref={provided.innerRef}
+      {...provided.draggableProps}
+      {...provided.dragHandleProps}
+      className={`h-full p-6 rounded-[2.2rem] border-2 transition-all select-none group shadow-sm ${snapshot.isDragging
+        ? 'bg-blue-600 border-blue-400 scale-110 z-[9999] rotate-2'
+        : 'bg-slate-900 border-white/5 hover:border-blue-500/50 hover:bg-slate-800'
+        }`}
+    >
+      <p className="font-black text-[13px] leading-tight mb-2 truncate">{item?.name}</p>
+      <div className="flex justify-between items-center text-[9px] font-mono tracking-widest opacity-30 uppercase">
+        <span>{item?.duration}</span>
+        <GripVertical size={14} className="opacity-10" />
+      </div>
+    </div>
+  );
+
   if (!enabled) return null;
 
   return (
@@ -340,42 +456,46 @@ function App() {
                 </div>
               </div>
 
-              <Droppable droppableId="library" isDropDisabled={true}>
+              <Droppable
+                droppableId="library"
+                isDropDisabled={true}
+                mode="virtual"
+                renderClone={(provided, snapshot, rubric) => renderLibraryCard(libraryItemAt(rubric.source.index), provided, snapshot)}
+              >
                 {(provided) => (
-                  <div {...provided.droppableProps} ref={provided.innerRef} className="flex-1 overflow-y-auto p-6 pt-2 space-y-4 custom-scrollbar">
-                    {library.filter(v => v.name.toLowerCase().includes(searchTerm.toLowerCase())).map((item, index) => (
-                      <Draggable key={item.libId} draggableId={item.libId} index={index}>
-                        {(provided, snapshot) => (
-                          <div
-                            ref={provided.innerRef}
-                            {...provided.draggableProps}
-                            {...provided.dragHandleProps}
-                            className={`p-6 rounded-[2.2rem] border-2 transition-all select-none group shadow-sm ${snapshot.isDragging
-                              ? 'bg-blue-600 border-blue-400 scale-110 z-[9999] rotate-2'
-                              : 'bg-slate-900 border-white/5 hover:border-blue-500/50 hover:bg-slate-800'
-                              }`}
-                          >
-                            <p className="font-black text-[13px] leading-tight mb-2 truncate">{item.name}</p>
-                            <div className="flex justify-between items-center text-[9px] font-mono tracking-widest opacity-30 uppercase">
-                              <span>{item.duration}</span>
-                              <GripVertical size={14} className="opacity-10" />
-                            </div>
-                          </div>
+                  <VirtualList
+                    {...provided.droppableProps}
+                    ref={provided.innerRef}
+                    itemCount={libraryTotal}
+                    rowHeight={LIBRARY_ROW_HEIGHT}
+                    onRangeChange={onLibraryRange}
+                    className="flex-1 px-6 custom-scrollbar"
+                    renderRow={(index, style) => (
+                      <div key={`lib-${index}`} style={style} className="pb-4">
+                        {libraryItemAt(index) ? (
+                          <Draggable draggableId={`lib-${index}`} index={index}>
+                            {(provided, snapshot) => renderLibraryCard(libraryItemAt(index), provided, snapshot)}
+                          </Draggable>
+                        ) : (
+                          <div className="h-full rounded-[2.2rem] border-2 border-white/5 bg-slate-900/50 animate-pulse" />
                         )}
-                      </Draggable>
-                    ))}
-                    {provided.placeholder}
-                  </div>
+                      </div>
+                    )}
+                  />
                 )}
               </Droppable>
             </div>
           </aside>
 
           <main className="flex-1 flex flex-col overflow-hidden bg-slate-950 relative">
-            <div className="flex-1 overflow-auto custom-scrollbar relative bg-slate-950">
+            <div
+              ref={gridRef}
+              onScroll={(e) => setGridViewport({ top: e.currentTarget.scrollTop, height: e.currentTarget.clientHeight })}
+              className="flex-1 overflow-auto custom-scrollbar relative bg-slate-950"
+            >
               <div className="w-fit min-w-full flex flex-col">
                 {/* STICKY WEEK HEADER */}
-                <div className="flex bg-slate-900 border-b border-white/5 sticky top-0 z-50 w-full min-w-max">
+                <div ref={gridHeaderRef} className="flex bg-slate-900 border-b border-white/5 sticky top-0 z-50 w-full min-w-max">
                   <div className="w-20 shrink-0 border-r border-white/10 bg-slate-900 flex items-center justify-center sticky left-0 z-[60]">
                     <Clock size={16} className="text-slate-800" />
                   </div>
@@ -401,7 +521,6 @@ function App() {
                   {/* COLUMNS */}
                   {weekDays.map(day => {
                     const dayStr = format(day, 'yyyy-MM-dd');
-                    const dayItems = processedSchedule.filter(item => item.uiDate === dayStr);
 
                     return (
                       <div key={dayStr} className={`flex-1 border-r border-white/10 relative min-w-[220px] ${isSameDay(day, new Date()) ? 'bg-blue-600/[0.02]' : ''}`}>
@@ -412,18 +531,17 @@ function App() {
                         </div>
 
                         <div className="relative h-full z-10">
-                          {[...Array(24)].map((_, h) => (
+                          {visibleHours.map(h => (
                             <Droppable key={`${dayStr}__${h}`} droppableId={`${dayStr}__${h}`}>
                               {(provided, snapshot) => (
                                 <div
                                   {...provided.droppableProps}
                                   ref={provided.innerRef}
-                                  style={{ height: hourHeight }}
-                                  className={`w-full relative transition-all ${snapshot.isDraggingOver ? 'bg-blue-600/10 border-2 border-blue-500/20 z-10 rounded-2xl' : ''
+                                  style={{ position: 'absolute', top: h * hourHeight, left: 0, right: 0, height: hourHeight }}
+                                  className={`w-full transition-all ${snapshot.isDraggingOver ? 'bg-blue-600/10 border-2 border-blue-500/20 z-10 rounded-2xl' : ''
                                     }`}
                                 >
-                                  {dayItems
-                                    .filter(item => Math.floor(item.uiStart / 60) === h)
+                                  {(blocksBySlot.get(`${dayStr}__${h}`) || [])
                                     .map((item, index) => {
                                       const topPos = (item.uiStart % 60) * minuteHeight;
                                       const heightPx = (item.uiEnd - item.uiStart) * minuteHeight;
@@ -0,0 +1,55 @@
+import React, { useState, useEffect, useRef, useCallback, forwardRef } from 'react';
+
+// Windowed list: only rows that intersect the viewport (plus overscan) are rendered.
+// `renderRow(index, style)` must apply `style` to the row it returns.
+const VirtualList = forwardRef(function VirtualList(
+  { itemCount, rowHeight, overscan = 4, renderRow, onRangeChange, className = '', children, ...rest },
+  ref
+) {
+  const containerRef = useRef(null);
+  const [scrollTop, setScrollTop] = useState(0);
+  const [viewportHeight, setViewportHeight] = useState(0);
+
+  const setRefs = useCallback((node) => {
+    containerRef.current = node;
+    if (typeof ref === 'function') ref(node);
+    else if (ref) ref.current = node;
+  }, [ref]);
+
+  useEffect(() => {
+    const node = containerRef.current;
+    if (!node) return;
+    setViewportHeight(node.clientHeight);
+    const observer = new ResizeObserver(() => setViewportHeight(node.clientHeight));
+    observer.observe(node);
+    return () => observer.disconnect();
+  }, []);
+
+  const start = Math.max(0, Math.floor(scrollTop / rowHeight) - overscan);
+  const end = Math.min(itemCount, Math.ceil((scrollTop + viewportHeight) / rowHeight) + overscan);
+
+  useEffect(() => {
+    if (onRangeChange && end > start) onRangeChange(start, end);
+  }, [start, end, onRangeChange]);
+
+  const rows = [];
+  for (let i = start; i < end; i++) {
+    rows.push(renderRow(i, { position: 'absolute', top: i * rowHeight, height: rowHeight, left: 0, right: 0 }));
+  }
+
+  return (
+    <div
+      {...rest}
+      ref={setRefs}
+      onScroll={(e) => setScrollTop(e.currentTarget.scrollTop)}
+      className={`overflow-y-auto ${className}`}
+    >
+      <div style={{ position: 'relative', height: itemCount * rowHeight }}>
+        {rows}
+      </div>
+      {children}
+    </div>
+  );
+});
+
+export default VirtualList;